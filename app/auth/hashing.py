@@ -0,0 +1,180 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from app.config import HASH_WORKERS, HASH_QUEUE_LIMIT, BCRYPT_ROUNDS, BCRYPT_TARGET_MS
+from app.metrics import observe_bcrypt
+
+# Lowest work factor calibration may pick, whatever the hardware
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+DEFAULT_ROUNDS = 12
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full and the request is shed"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, retry later")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded worker pool. At most
+    `queue_limit` interactive jobs may wait for a worker; further ones are shed.
+    Background jobs (shed=False, e.g. bulk imports) are never shed but may use at
+    most half of the workers, so interactive jobs always find a free one soon.
+    New hashes use `rounds`, fixed by configuration or set by `calibrate`.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT,
+                 rounds: int | None = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self._background = asyncio.Semaphore(max(1, workers // 2))
+        self.fixed_rounds = rounds is not None
+        self.rounds = rounds or DEFAULT_ROUNDS
+        self.seconds_per_hash = 0.25
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def hash(self, password: str, shed: bool = True) -> str:
+        """
+        Hash a password without blocking the event loop
+        :param password: Plain text password
+        :param shed: Raise HashingOverloaded instead of queueing past the limit;
+                     False runs it as a background job
+        :return: Hashed password
+        """
+        return await self._run("hash", shed, hash_password_sync, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str, shed: bool = True) -> bool:
+        """
+        Check a password against a hash without blocking the event loop
+        :param password: Plain text password
+        :param hashed: Stored bcrypt hash
+        :param shed: Raise HashingOverloaded instead of queueing past the limit;
+                     False runs it as a background job
+        :return: True if the password matches
+        """
+        return await self._run("verify", shed, verify_password_sync, password, hashed)
+
+    async def _run(self, operation: str, shed: bool, fn, *args):
+        if not shed:
+            # Counted against the background share, not the shedding threshold
+            async with self._background:
+                return await self._execute(operation, fn, *args)
+
+        if self.pending >= self.workers + self.queue_limit:
+            # Roughly how long the queued jobs need to drain
+            drain = self.pending / self.workers * self.seconds_per_hash
+            raise HashingOverloaded(retry_after=max(1, math.ceil(drain)))
+
+        self.pending += 1
+        try:
+            return await self._execute(operation, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def _execute(self, operation: str, fn, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            observe_bcrypt(operation, time.perf_counter() - start)
+
+    async def calibrate(self, target_ms: float = BCRYPT_TARGET_MS) -> int:
+        """
+        Pick the work factor whose hash time on this machine is closest to the target,
+        unless one was configured
+        :param target_ms: Target milliseconds per hash
+        :return: Work factor in use
+        """
+        loop = asyncio.get_running_loop()
+        base = await loop.run_in_executor(self._executor, base_hash_seconds)
+        if not self.fixed_rounds:
+            self.rounds = rounds_for_target(base, target_ms)
+        self.seconds_per_hash = base * 2 ** (self.rounds - MIN_ROUNDS)
+        return self.rounds
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """
+        Check whether a stored hash was made with a lower work factor. Only upgrades:
+        workers calibrate separately and may disagree by a round, and each rehash
+        revokes the user's tokens, so hashes must not flip between them.
+        :param hashed: Stored bcrypt hash
+        :return: True if the hash should be replaced
+        """
+        return hash_rounds(hashed) < self.rounds
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, waiting for running jobs"""
+        self._executor.shutdown(wait=True)
+
+
+def hash_password_sync(password: str, rounds: int = DEFAULT_ROUNDS) -> str:
+    """
+    Hash a password on the calling thread
+    :param password: Plain text password
+    :param rounds: bcrypt work factor
+    :return: Hashed password
+    """
+    salt = bcrypt.gensalt(rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    """
+    Check a password against a hash on the calling thread
+    :param password: Plain text password
+    :param hashed: Stored bcrypt hash
+    :return: True if the password matches
+    """
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed: str) -> int:
+    """
+    Read the work factor from a bcrypt hash (`$2b$<rounds>$...`)
+    :param hashed: Stored bcrypt hash
+    :return: Work factor
+    """
+    return int(hashed.split('$')[2])
+
+
+def time_hash(rounds: int) -> float:
+    """
+    Measure one hash at the given work factor
+    :param rounds: bcrypt work factor
+    :return: Seconds taken
+    """
+    start = time.perf_counter()
+    hash_password_sync("calibration", rounds)
+    return time.perf_counter() - start
+
+
+def base_hash_seconds() -> float:
+    """
+    Measure a hash at MIN_ROUNDS. Each extra round doubles the cost, so this one
+    measurement is enough to extrapolate to any work factor.
+    :return: Seconds per hash at MIN_ROUNDS
+    """
+    time_hash(MIN_ROUNDS)  # warm up
+    return min(time_hash(MIN_ROUNDS) for _ in range(3))
+
+
+def rounds_for_target(base_seconds: float, target_ms: float) -> int:
+    """
+    Find the work factor closest to a target hash time
+    :param base_seconds: Seconds per hash at MIN_ROUNDS
+    :param target_ms: Target milliseconds per hash
+    :return: Work factor between MIN_ROUNDS and MAX_ROUNDS
+    """
+    rounds = MIN_ROUNDS + round(math.log2(target_ms / (base_seconds * 1000)))
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+
+
+hasher = PasswordHasher()
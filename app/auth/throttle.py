@@ -0,0 +1,72 @@
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from app.config import LOGIN_FAILURE_BURST, LOGIN_FAILURE_RATE
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by an arbitrary string. The least recently
+    used buckets are dropped beyond `max_keys` to bound memory.
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int = 100_000):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key: str) -> float:
+        """
+        Seconds until `key` has a token again
+        :param key: Bucket key
+        :return: 0 if a token is available
+        """
+        tokens = self._tokens(key, time.monotonic())
+        if tokens >= 1:
+            return 0
+        return (1 - tokens) / self.rate if self.rate else math.inf
+
+    def consume(self, key: str) -> None:
+        """
+        Take one token from `key`'s bucket
+        :param key: Bucket key
+        """
+        now = time.monotonic()
+        self._buckets[key] = (max(0.0, self._tokens(key, now) - 1), now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+email_failures = TokenBucketLimiter(LOGIN_FAILURE_BURST, LOGIN_FAILURE_RATE)
+client_failures = TokenBucketLimiter(LOGIN_FAILURE_BURST * 4, LOGIN_FAILURE_RATE * 4)
+
+
+def check_login_throttle(email: str, client: str | None) -> None:
+    """
+    Reject a password check, before running bcrypt, when the email or the client
+    has used up its failed attempts
+    :param email: User email
+    :param client: Client address
+    """
+    wait = max(email_failures.retry_after(email), client_failures.retry_after(client) if client else 0)
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many failed login attempts",
+                            headers={"Retry-After": str(math.ceil(wait))})
+
+
+def record_login_failure(email: str, client: str | None) -> None:
+    """
+    Count a failed password check against the email and the client
+    :param email: User email
+    :param client: Client address
+    """
+    email_failures.consume(email)
+    if client:
+        client_failures.consume(client)
@@ -0,0 +1,70 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from fastapi.security import HTTPBearer
+from app.config import AUTH_SECRET, TOKEN_TTL
+from app.models.auth import Token
+from app.models.user import User
+
+bearer = HTTPBearer(auto_error=False)
+
+_KEY = AUTH_SECRET.encode('utf-8')
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(data: bytes) -> bytes:
+    return hmac.new(_KEY, data, hashlib.sha256).digest()
+
+
+def password_fingerprint(hashed_password: str) -> str:
+    """
+    Short keyed digest of a stored password hash. Embedding it in tokens revokes
+    every outstanding token as soon as the password changes.
+    :param hashed_password: Stored bcrypt hash
+    :return: Fingerprint
+    """
+    return _b64encode(_sign(hashed_password.encode('utf-8'))[:12])
+
+
+def issue_token(user: User) -> Token:
+    """
+    Issue a signed access token for an authenticated user
+    :param user: Authenticated User
+    :return: Token
+    """
+    payload = {
+        "sub": user.email,
+        "exp": int(time.time()) + TOKEN_TTL,
+        "pwd": password_fingerprint(user.password),
+    }
+    body = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    signature = _b64encode(_sign(body.encode('ascii')))
+    return Token(access_token=f"{body}.{signature}", expires_in=TOKEN_TTL)
+
+
+def verify_token(token: str) -> dict:
+    """
+    Check a token's signature and expiry without touching the database
+    :param token: Access token
+    :return: Token payload
+    """
+    try:
+        body, signature = token.split('.')
+        valid = hmac.compare_digest(_b64decode(signature), _sign(body.encode('ascii')))
+        payload = json.loads(_b64decode(body)) if valid else None
+    except (ValueError, UnicodeEncodeError):
+        payload = None
+
+    if not isinstance(payload, dict) or payload.get("exp", 0) < time.time():
+        raise ValueError("Invalid or expired token")
+
+    return payload
@@ -1,38 +1,160 @@
 from fastapi import HTTPException
-from sqlmodel import Session, select
-import bcrypt
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import re
 from app.models.user import User
+from app.auth.hashing import hasher, HashingOverloaded
+from app.auth.tokens import verify_token, password_fingerprint
+from app.auth.throttle import check_login_throttle, record_login_failure
 
 
-def authenticate_user(email: str, password: str, session: Session) -> User:
+async def authenticate_user(email: str, password: str, session: AsyncSession,
+                            client: str | None = None) -> User:
     """
     Authenticate a user by email and password
     :param email: User email
     :param password: User password
     :param session: Database session
+    :param client: Client address, used to throttle failed attempts
     :return: Authenticated User
     """
-    user = session.exec(select(User).where(User.email == email)).first()
+    check_login_throttle(email, client)
+
+    user = (await session.exec(select(User).where(User.email == email))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
-        raise ValueError("Incorrect password")
-    
+    await check_password(email, password, user.password, client)
+
+    if hasher.needs_rehash(user.password):
+        await rehash_password(user, password, session)
+
     return user
 
 
-def hash_user_password(password: str) -> str:
+async def check_password(email: str, password: str, hashed: str, client: str | None = None) -> None:
+    """
+    Check a password against the stored hash, counting failures for throttling
+    :param email: User email
+    :param password: User password
+    :param hashed: Stored bcrypt hash
+    :param client: Client address
+    """
+    if not await hasher.verify(password, hashed):
+        record_login_failure(email, client)
+        raise ValueError("Incorrect password")
+
+
+async def rehash_password(user: User, password: str, session: AsyncSession) -> None:
+    """
+    Replace a stored hash made with an outdated work factor. Skipped under load and
+    on read replicas; the next successful login will retry.
+    :param user: Authenticated user
+    :param password: Verified plain text password
+    :param session: Database session
+    """
+    if session.info.get("replica"):
+        return
+    try:
+        user.password = await hasher.hash(password)
+    except HashingOverloaded:
+        return
+    session.add(user)
+    await session.commit()
+
+
+async def authorize_user(email: str, session: AsyncSession,
+                         password: str | None = None, token: str | None = None,
+                         client: str | None = None) -> User:
+    """
+    Authorize access to a user by access token, falling back to the password
+    :param email: User email
+    :param session: Database session
+    :param password: User password
+    :param token: Access token issued by the login endpoint
+    :param client: Client address, used to throttle failed password attempts
+    :return: Authorized User
+    """
+    if token:
+        payload = verify_user_token(email, token)
+
+        user = await session.get(User, email)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        check_token_password(payload, user.password)
+        return user
+
+    if password is None:
+        raise ValueError("Missing password or access token")
+
+    return await authenticate_user(email, password, session, client)
+
+
+async def authorize_row(email: str, session: AsyncSession, columns: tuple,
+                        password: str | None = None, token: str | None = None,
+                        client: str | None = None):
+    """
+    Authorize access to a user like authorize_user, but select only `columns` and
+    the password hash instead of loading a User. Outdated hashes are not replaced.
+    :param email: User email
+    :param session: Database session
+    :param columns: Columns to select
+    :param password: User password
+    :param token: Access token issued by the login endpoint
+    :param client: Client address, used to throttle failed password attempts
+    :return: Row of `columns`, followed by the password hash
+    """
+    if token:
+        payload = verify_user_token(email, token)
+    elif password is None:
+        raise ValueError("Missing password or access token")
+    else:
+        check_login_throttle(email, client)
+
+    row = (await session.exec(select(*columns, User.password).where(User.email == email))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if token:
+        check_token_password(payload, row.password)
+    else:
+        await check_password(email, password, row.password, client)
+    return row
+
+
+def verify_user_token(email: str, token: str) -> dict:
+    """
+    Check a token's signature, expiry and subject without touching the database
+    :param email: User email the token must belong to
+    :param token: Access token
+    :return: Token payload
+    """
+    payload = verify_token(token)
+    if payload["sub"] != email:
+        raise ValueError("Token does not match user")
+    return payload
+
+
+def check_token_password(payload: dict, hashed_password: str) -> None:
+    """
+    Reject a token issued before the user's password last changed
+    :param payload: Token payload
+    :param hashed_password: Stored bcrypt hash
+    """
+    if payload["pwd"] != password_fingerprint(hashed_password):
+        raise ValueError("Invalid or expired token")
+
+
+async def hash_user_password(password: str, shed: bool = True) -> str:
     """
     Hash the user's password
     :param password: Password to hash
+    :param shed: Refuse with HashingOverloaded when hashing is overloaded
     :return: Hashed password
     """
     validate_password(password)
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    return await hasher.hash(password, shed=shed)
 
 
 def validate_password(password: str) -> str:
@@ -1,9 +1,12 @@
+import asyncio
 from datetime import datetime, timedelta
-from sqlmodel import Session, select
+from sqlmodel import select
 from app.models.consts import ZONE
 from app.models.user import User
-from app.database import engine
+from app.database import async_session, dispose_engines
 from app.auth.utils import hash_user_password
+from app.auth.hashing import hasher
+from app.cache import commit_users_change
 
 USERS = [
     {"email": "yarden@example.com", "name": "Yarden", "password": "Securepassword1", "registrationTimestamp": "2023-01-01T12:01:09Z", "roles": ["admin", "user"]},
@@ -13,13 +16,29 @@ USERS = [
 ]
 
 
-def init_data():
-    """Initialize the database with predefined users"""
-    with Session(engine) as session:
-        for user_data in USERS:
-            user = session.exec(select(User).where(User.email == user_data["email"])).first()
-            if not user:
-                user = User(**user_data)
-                user.password = hash_user_password(user.password)
-                session.add(user)
-        session.commit()
+async def init_data():
+    """Initialize the database with predefined users, inserting the missing ones in one batch"""
+    emails = [user_data["email"] for user_data in USERS]
+    async with async_session() as session:
+        existing = set((await session.exec(select(User.email).where(User.email.in_(emails)))).all())
+        missing = [User.model_validate(user_data) for user_data in USERS if user_data["email"] not in existing]
+        if not missing:
+            return
+
+        # Logins are served before the app is ready; seeding must not be shed by them
+        hashes = await asyncio.gather(*(hash_user_password(user.password, shed=False) for user in missing))
+        for user, hashed in zip(missing, hashes):
+            user.password = hashed
+
+        session.add_all(missing)
+        await commit_users_change(session)
+
+
+async def main():
+    await hasher.calibrate()
+    await init_data()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,218 @@
+import asyncio
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth.hashing import hasher
+from app.auth.utils import validate_password
+from app.cache import commit_users_change
+from app.config import BULK_CHUNK_SIZE, BULK_MAX_ERRORS, BULK_MAX_LINE
+from app.models.bulk import BulkError, BulkResult
+from app.models.consts import ZONE
+from app.models.user import User
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv",)
+
+
+def decode_line(line: bytes) -> str:
+    return line.decode('utf-8', errors='replace').rstrip('\r')
+
+
+async def read_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str | ValueError]]:
+    """
+    Split a byte stream into numbered, non-empty text lines. At most BULK_MAX_LINE
+    bytes of a line are buffered; a longer line is skipped and yields an error.
+    :param stream: Request body stream
+    :return: Async iterator of (line number, line or error)
+    """
+    buffer = bytearray()
+    too_long = False
+    number = 0
+    async for chunk in stream:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            part = chunk[start:] if end < 0 else chunk[start:end]
+            if not too_long:
+                too_long = len(buffer) + len(part) > BULK_MAX_LINE
+                if too_long:
+                    buffer.clear()
+                else:
+                    buffer += part
+            if end < 0:
+                break
+
+            number += 1
+            if too_long:
+                yield number, ValueError(f"Line is longer than {BULK_MAX_LINE} bytes")
+            elif buffer.strip():
+                yield number, decode_line(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+
+    if too_long:
+        yield number + 1, ValueError(f"Line is longer than {BULK_MAX_LINE} bytes")
+    elif buffer.strip():
+        yield number + 1, decode_line(buffer)
+
+
+async def read_records(stream: AsyncIterator[bytes], content_type: str) -> AsyncIterator[tuple[int, dict]]:
+    """
+    Parse an NDJSON or CSV body into user records, one per line.
+    CSV needs a header row; roles are separated by ';'.
+    :param stream: Request body stream
+    :param content_type: Media type of the body
+    :return: Async iterator of (line number, record or parsing error)
+    """
+    if content_type in NDJSON_TYPES:
+        async for number, line in read_lines(stream):
+            if isinstance(line, ValueError):
+                yield number, line
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+
+    elif content_type in CSV_TYPES:
+        header = None
+        async for number, line in read_lines(stream):
+            if isinstance(line, ValueError):
+                if header is None:
+                    raise HTTPException(status_code=400, detail=str(line))
+                yield number, line
+                continue
+            row = next(csv.reader([line]))
+            if header is None:
+                header = row
+                continue
+            record = dict(zip(header, row))
+            if 'roles' in record:
+                record['roles'] = [role for role in record['roles'].split(';') if role]
+            yield number, record
+
+    else:
+        raise HTTPException(status_code=415, detail="Expected NDJSON or CSV body")
+
+
+def validate_record(record) -> User:
+    """
+    Validate a record the same way create_user does
+    :param record: Parsed record
+    :return: User with a plain text password
+    """
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Expected an object")
+
+    user = User.model_validate(record)
+    if not user.email:
+        raise ValueError("Email is required")
+    validate_password(user.password)
+    if not user.roles:
+        raise ValueError("User must have at least one role")
+    return user
+
+
+def describe_error(exc: Exception) -> str:
+    """
+    Turn a validation error into a one-line message
+    :param exc: Raised exception
+    :return: Error message
+    """
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+    return str(exc)
+
+
+class BulkImporter:
+    """Validates, hashes and inserts streamed users in bounded chunks"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.result = BulkResult()
+        self._chunk: list[tuple[int, User]] = []
+
+    def reject(self, line: int, error: str) -> None:
+        """
+        Record a rejected row
+        :param line: Line number in the upload
+        :param error: Reason
+        """
+        self.result.failed += 1
+        if len(self.result.errors) < BULK_MAX_ERRORS:
+            self.result.errors.append(BulkError(line=line, error=error))
+
+    async def add(self, line: int, record) -> None:
+        """
+        Queue a record, flushing when the chunk is full
+        :param line: Line number in the upload
+        :param record: Parsed record or parsing error
+        """
+        try:
+            user = validate_record(record)
+        except (ValueError, TypeError) as exc:
+            self.reject(line, describe_error(exc))
+            return
+
+        self._chunk.append((line, user))
+        if len(self._chunk) >= BULK_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Hash the pending chunk in parallel and insert it in one transaction"""
+        if not self._chunk:
+            return
+
+        chunk, self._chunk = self._chunk, []
+        hashes = await asyncio.gather(*(hasher.hash(user.password, shed=False) for _, user in chunk))
+        now = datetime.now(ZONE)
+        rows = {}
+        for (line, user), hashed in zip(chunk, hashes):
+            if user.email in rows:
+                self.reject(line, "Duplicate email in upload")
+                continue
+            rows[user.email] = (line, {
+                "email": user.email,
+                "name": user.name,
+                "password": hashed,
+                "registrationTimestamp": now,
+                "roles": user.roles,
+            })
+
+        statement = (
+            insert(User)
+            .values([row for _, row in rows.values()])
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.email)
+        )
+        inserted = set((await self.session.execute(statement)).scalars())
+        await commit_users_change(self.session)
+
+        self.result.inserted += len(inserted)
+        for email, (line, _) in rows.items():
+            if email not in inserted:
+                self.reject(line, "User already exists")
+
+
+async def import_users(stream: AsyncIterator[bytes], content_type: str, session: AsyncSession) -> BulkResult:
+    """
+    Import users from a streamed NDJSON or CSV body
+    :param stream: Request body stream
+    :param content_type: Media type of the body
+    :param session: Database session
+    :return: Import summary with per-row errors
+    """
+    importer = BulkImporter(session)
+    async for line, record in read_records(stream, content_type):
+        await importer.add(line, record)
+    await importer.flush()
+    importer.result.errors.sort(key=lambda error: error.line)
+    return importer.result
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import DATABASE_URL, CACHE_MAX_ENTRIES, CACHE_TTL
+from app.database import to_dsn
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "users_changed"
+
+
+class ListingCache:
+    """LRU cache with TTL for listing responses, tagged with a table version"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.invalidated_at = 0.0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Look up a cached value
+        :param key: Cache key
+        :return: Cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, version: int, settle: float = 0) -> None:
+        """
+        Store a value computed while the table was at `version`. Values computed
+        before a later invalidation are dropped instead of cached.
+        :param key: Cache key
+        :param value: Value to cache
+        :param version: Table version read before computing the value
+        :param settle: Also drop the value if the last invalidation is more recent than
+                       this many seconds, e.g. when it was read from a lagging replica
+        """
+        if not self.enabled or version != self.version:
+            return
+        if settle and time.monotonic() - self.invalidated_at < settle:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Bump the table version and drop every entry"""
+        self.version += 1
+        self.invalidations += 1
+        self.invalidated_at = time.monotonic()
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Cache counters"""
+        return {
+            "entries": len(self._entries),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+listing_cache = ListingCache()
+
+
+async def commit_users_change(session: AsyncSession) -> None:
+    """
+    Commit a write to the user table and invalidate listing caches in every worker
+    :param session: Database session holding the write
+    """
+    await session.execute(text(f"NOTIFY {CHANNEL}"))
+    await session.commit()
+    listing_cache.invalidate()
+
+
+class InvalidationListener:
+    """Listens for change notifications from other workers and invalidates the local cache"""
+
+    def __init__(self, cache: ListingCache, retry_delay: float = 1.0):
+        self.cache = cache
+        self.retry_delay = retry_delay
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start listening in the background"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop listening"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.cache.invalidate()
+
+    async def _run(self) -> None:
+        import asyncpg  # deferred: only needed once the listener runs, keeps app import fast
+
+        dsn = to_dsn(DATABASE_URL)
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Cache invalidation listener cannot connect: %s", exc)
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            try:
+                await conn.add_listener(CHANNEL, self._on_notify)
+                # Writes may have been missed while disconnected
+                self.cache.invalidate()
+                await closed.wait()
+            finally:
+                await conn.close()
+            logger.warning("Cache invalidation listener disconnected, reconnecting")
+            self.cache.invalidate()
+            await asyncio.sleep(self.retry_delay)
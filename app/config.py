@@ -0,0 +1,90 @@
+import os
+import secrets
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+DATABASE_URL = os.getenv('DB_PATH')
+# Optional read replica for listing and lookup routes
+READ_DATABASE_URL = os.getenv('DB_READ_PATH')
+# Seconds a client keeps reading from the primary after a write (read-your-writes)
+READ_STICKY_SECONDS = float(os.getenv('READ_STICKY_SECONDS', 5))
+# Seconds reads stay on the primary after the replica fails to connect
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+# Number of worker threads used for bcrypt hashing (bcrypt releases the GIL)
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', os.cpu_count() or 1))
+# Hashing jobs allowed to wait for a worker before new ones are rejected with 503
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', 32))
+# bcrypt work factor; when unset it is calibrated at startup to BCRYPT_TARGET_MS per hash
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS')) if os.getenv('BCRYPT_ROUNDS') else None
+BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', 250))
+
+# Database connection pool
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# Connections opened at startup, before the app reports ready (at most DB_POOL_SIZE)
+DB_POOL_WARM = min(int(os.getenv('DB_POOL_WARM', DB_POOL_SIZE)), DB_POOL_SIZE)
+
+# Signing key and lifetime (seconds) of access tokens. Without AUTH_SECRET a random
+# key is generated, so tokens are only valid on the worker that issued them.
+AUTH_SECRET = os.getenv('AUTH_SECRET') or secrets.token_hex(32)
+TOKEN_TTL = int(os.getenv('TOKEN_TTL', 900))
+
+# Bulk import: rows per transaction, maximum number of row errors reported and
+# longest accepted line in bytes
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', 1000))
+BULK_MAX_LINE = int(os.getenv('BULK_MAX_LINE', 65536))
+
+# Rows fetched per round trip by the streaming export
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+# Matches of each kind (email prefix, name prefix, other) ranked by a search
+SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', 1000))
+
+# Background bulk jobs: rows per transaction, seconds to pause between batches,
+# jobs running at once and finished jobs kept for the status endpoint
+JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', 1000))
+JOB_BATCH_PAUSE = float(os.getenv('JOB_BATCH_PAUSE', 0.01))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+JOB_HISTORY = int(os.getenv('JOB_HISTORY', 100))
+
+# Seed the predefined users on startup (also available as `python -m app.autogen`)
+SEED_ON_STARTUP = os.getenv('SEED_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+# Seconds the readiness probe waits for a database connection
+READY_TIMEOUT = float(os.getenv('READY_TIMEOUT', 1))
+
+# In-process cache of listing pages, invalidated on writes (CACHE_TTL=0 disables it)
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+CACHE_TTL = float(os.getenv('CACHE_TTL', 30))
+# Propagate invalidations between workers with PostgreSQL LISTEN/NOTIFY
+CACHE_LISTEN = os.getenv('CACHE_LISTEN', 'true').lower() in ('1', 'true', 'yes')
+
+# Append every request to this JSONL file in the load-test workload format
+RECORD_WORKLOAD = os.getenv('RECORD_WORKLOAD')
+
+# Log SQL statements slower than SLOW_QUERY_MS, sampling SLOW_QUERY_SAMPLE of them.
+# DB_ECHO=true restores SQLAlchemy's full statement echo.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_SAMPLE = float(os.getenv('SLOW_QUERY_SAMPLE', 1.0))
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() in ('1', 'true', 'yes')
+# Warn when a single request issues more than this many SQL statements (0 disables)
+REQUEST_QUERY_WARN = int(os.getenv('REQUEST_QUERY_WARN', 20))
+
+# Per-request profiling: requests sending `X-Profile: <PROFILE_SECRET>`, and a
+# PROFILE_SAMPLE fraction of all requests, get a report written to PROFILE_DIR.
+# With neither set the profiling middleware is not installed.
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+PROFILE_SAMPLE = float(os.getenv('PROFILE_SAMPLE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Milliseconds between stack samples of a profiled request
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 1))
+
+# Failed password checks allowed per email and per client IP before throttling (token bucket)
+LOGIN_FAILURE_BURST = int(os.getenv('LOGIN_FAILURE_BURST', 5))
+# Failed checks regained per minute
+LOGIN_FAILURE_RATE = float(os.getenv('LOGIN_FAILURE_RATE', 5))
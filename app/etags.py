@@ -0,0 +1,53 @@
+import hashlib
+import time
+from sqlalchemy import literal_column
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.table_version import TableVersion
+
+# PostgreSQL's transaction id of the last write to a row; changes on every UPDATE
+ROW_VERSION = literal_column("xmin::text").label("row_version")
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the values that determine a response
+    :param parts: Version numbers and request parameters
+    :return: Quoted ETag
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def time_window(seconds: float) -> int:
+    """
+    Number of the current time window, for ETags of results that change with the
+    clock even while the table does not (e.g. the last 24 hours)
+    :param seconds: Window length
+    :return: Window number
+    """
+    return int(time.time() // seconds)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match header against the current ETag
+    :param if_none_match: Header value, possibly a list or `*`
+    :param etag: Current ETag
+    :return: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2): W/ is ignored on both sides
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+async def users_version(session: AsyncSession) -> int:
+    """
+    Read the user table's change counter. Read it before the data it tags, so a
+    concurrent write can only make the ETag older than the data, never newer.
+    :param session: Database session
+    :return: Change counter
+    """
+    return (await session.exec(select(TableVersion.version).where(TableVersion.name == "user"))).one()
@@ -0,0 +1,72 @@
+import csv
+import io
+from enum import Enum
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select
+from app.config import EXPORT_BATCH_SIZE
+from app.serialization import PUBLIC_COLUMNS, PUBLIC_FIELDS, dumps, format_timestamp, public_dict
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def encode_ndjson(rows) -> bytes:
+    """
+    Encode rows as newline-delimited JSON
+    :param rows: Rows of PUBLIC_COLUMNS
+    :return: NDJSON bytes
+    """
+    return b"".join(dumps(public_dict(row)) + b"\n" for row in rows)
+
+
+def encode_csv(rows, header: bool = False) -> str:
+    """
+    Encode rows as CSV, roles separated by ';' as accepted by the bulk import
+    :param rows: Rows of PUBLIC_COLUMNS
+    :param header: Whether to write the header row first
+    :return: CSV text
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(PUBLIC_FIELDS)
+    writer.writerows(
+        (email, name, format_timestamp(timestamp), ";".join(roles or ()))
+        for email, name, timestamp, roles in rows
+    )
+    return buffer.getvalue()
+
+
+async def export_users(where, export_format: ExportFormat, conn: AsyncConnection) -> AsyncIterator[str | bytes]:
+    """
+    Stream users matching a filter from a server-side cursor, without passwords
+    :param where: SQL filter, or None for all users
+    :param export_format: Output format
+    :param conn: Open connection, closed once the export ends
+    :return: Async iterator of encoded batches
+    """
+    query = select(*PUBLIC_COLUMNS)
+    if where is not None:
+        query = query.where(where)
+
+    try:
+        if export_format == ExportFormat.CSV:
+            yield encode_csv((), header=True)
+
+        result = await conn.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            if export_format == ExportFormat.CSV:
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(rows)
+    finally:
+        await conn.close()
@@ -0,0 +1,97 @@
+import sys
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import and_, case, false, func, or_, select, union_all
+from app.models.user import User
+from app.models.consts import ZONE, Criteria
+from app.models.roles import ROLE_BITS, has_role
+from app.serialization import PUBLIC_COLUMNS
+
+# Shorter text has no trigram to look up in the search indexes
+SEARCH_MIN_LENGTH = 3
+
+
+def criteria_filter(criteria: Criteria | None, value: str | None):
+    """
+    Build the WHERE clause for a listing criteria
+    :param criteria: Criteria to filter users
+    :param value: Value for the criteria
+    :return: SQL expression, or None when no criteria is given
+    """
+    if not criteria:
+        return None
+
+    elif not value and criteria != Criteria.REGISTERATION_TODAY:
+        raise HTTPException(status_code=400, detail="Value is required for the specified criteria")
+
+    elif criteria == Criteria.ROLE:
+        if value not in ROLE_BITS:
+            return false()
+        return has_role(User.roles, value)
+
+    elif criteria == Criteria.EMAIL_DOMAIN:
+        return User.emailDomain == value
+
+    elif criteria == Criteria.REGISTERATION_TODAY:
+        last_24_hours = datetime.now(tz=ZONE) - timedelta(hours=24)
+        return User.registrationTimestamp >= last_24_hours
+
+    raise HTTPException(status_code=400, detail="Invalid criteria")
+
+
+def prefix_range(key, prefix: str):
+    """
+    :param key: Expression in "C" collation, as indexed
+    :param prefix: Lowercase text
+    :return: Condition for key starting with prefix, as a range the btree can seek
+    """
+    condition = key >= prefix
+    if ord(prefix[-1]) < sys.maxunicode:
+        condition = and_(condition, key < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return condition
+
+
+def search_candidates(q: str, limit: int):
+    """
+    Build the ranked matches of a search over name and email. Each kind of match is
+    read in index order and cut at `limit`, so broad terms stop early and every page
+    of a search ranks the same set:
+    emails starting with the text (lower(email) index; the exact match sorts first),
+    names starting with it (lower(name) index), and any match by email (trigram
+    indexes, or the primary key for broad terms).
+    :param q: Text to find anywhere in the name or email, case-insensitively
+    :param limit: Matches kept per kind
+    :return: Subquery of PUBLIC_COLUMNS, rank (exact email, email prefix, name prefix,
+             other) and truncated (some kind had more matches than it kept)
+    """
+    if len(q) < SEARCH_MIN_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Search text needs at least {SEARCH_MIN_LENGTH} characters")
+
+    text = q.lower()
+    email_key = func.lower(User.email).collate("C")
+    name_key = func.lower(User.name).collate("C")
+    rank = case(
+        (email_key == text, 0),
+        (User.email.istartswith(q, autoescape=True), 1),
+        (User.name.istartswith(q, autoescape=True), 2),
+        else_=3,
+    )
+    kinds = (
+        (prefix_range(email_key, text), email_key),
+        (prefix_range(name_key, text), name_key),
+        (or_(User.email.icontains(q, autoescape=True), User.name.icontains(q, autoescape=True)), User.email),
+    )
+    matches = union_all(*(
+        select(select(*PUBLIC_COLUMNS, rank.label("rank"), func.row_number().over(order_by=key).label("position"))
+               .where(where).order_by(key).limit(limit + 1).subquery())
+        for where, key in kinds
+    )).cte("matches")
+
+    truncated = select(func.coalesce(func.bool_or(matches.c.position > limit), False)).scalar_subquery()
+    return (
+        select(*(matches.c[column.key] for column in PUBLIC_COLUMNS), matches.c.rank, truncated.label("truncated"))
+        .where(matches.c.position <= limit)
+        .distinct(matches.c.email)
+        .order_by(matches.c.email, matches.c.rank)
+        .subquery()
+    )
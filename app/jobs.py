@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import select
+from app.cache import commit_users_change
+from app.config import JOB_BATCH_SIZE, JOB_BATCH_PAUSE, JOB_WORKERS, JOB_HISTORY
+from app.database import async_session
+from app.models.consts import ZONE, Criteria
+from app.models.job import Job, JobState, RoleChange
+from app.models.roles import mask_expression, roles_to_mask
+from app.models.user import User
+from app.pagination import TotalMode, count_rows
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """
+    Runs bulk operations as background tasks, at most `workers` at a time. Jobs are
+    stored in the job table, so any worker can report them; the last `history`
+    finished jobs are kept.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.history = history
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def submit(self, kind: str, criteria: Criteria | None, value: str | None,
+                     operation: Callable[[str], Awaitable[None]]) -> Job:
+        """
+        Store and queue a bulk operation
+        :param kind: Operation name shown in the status
+        :param criteria: Criteria the operation was filtered by
+        :param value: Value for the criteria
+        :param operation: Coroutine function doing the work for a job id, recording its progress
+        :return: The queued job
+        """
+        job = Job(id=uuid.uuid4().hex, kind=kind, criteria=criteria and criteria.value, value=value,
+                  created_at=datetime.now(ZONE))
+        async with async_session() as session:
+            session.add(job)
+            await self._prune(session)
+            await session.commit()
+
+        task = asyncio.create_task(self._run(job.id, operation))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    async def stop(self) -> None:
+        """Cancel running and queued jobs, recording them as cancelled"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job_id: str, operation: Callable[[str], Awaitable[None]]) -> None:
+        try:
+            async with self._slots:
+                await self._record(job_id, JobState.RUNNING)
+                await operation(job_id)
+                await self._record(job_id, JobState.DONE)
+        except asyncio.CancelledError:
+            await self._record(job_id, JobState.CANCELLED, "Interrupted by shutdown")
+            raise
+        except Exception as exc:
+            logger.exception("Job %s failed", job_id)
+            await self._record(job_id, JobState.FAILED, str(exc))
+
+    async def _record(self, job_id: str, state: JobState, error: str | None = None) -> None:
+        """
+        Record a job's state; every state but RUNNING ends the job
+        :param job_id: Job id
+        :param state: New state
+        :param error: Reason, for failed and cancelled jobs
+        """
+        values = {"state": state, "updated_at": func.now()}
+        if state != JobState.RUNNING:
+            values.update(error=error, finished_at=func.now())
+        try:
+            async with async_session() as session:
+                await session.exec(update(Job).where(Job.id == job_id).values(**values))
+                await session.commit()
+        except (OSError, SQLAlchemyError):
+            if state == JobState.RUNNING:
+                raise
+            logger.exception("Could not record job %s as %s", job_id, state.value)
+
+    async def _prune(self, session) -> None:
+        kept = select(Job.id).where(Job.finished_at.is_not(None)).order_by(Job.finished_at.desc()).limit(self.history)
+        await session.exec(delete(Job).where(Job.finished_at.is_not(None), Job.id.not_in(kept)))
+
+
+job_runner = JobRunner()
+
+
+async def run_batches(job_id: str, where, apply) -> None:
+    """
+    Walk the users matching `where` in primary key order and apply a set-based
+    statement to JOB_BATCH_SIZE of them per short transaction. Each batch is a single
+    statement that also returns the last key, so nothing is held between batches.
+    The job's progress is written in the batch's transaction.
+    :param job_id: Job to record progress on
+    :param where: SQL filter, or None for all users
+    :param apply: Builds the UPDATE/DELETE for the emails in a batch CTE
+    """
+    keys = select(User.email)
+    if where is not None:
+        keys = keys.where(where)
+
+    async with async_session() as session:
+        estimated = await count_rows(session, keys, TotalMode.ESTIMATE)
+        await session.exec(update(Job).where(Job.id == job_id).values(estimated_rows=estimated, updated_at=func.now()))
+        await session.commit()
+
+    last = None
+    while True:
+        page = keys if last is None else keys.where(User.email > last)
+        batch = page.order_by(User.email).limit(JOB_BATCH_SIZE).cte("batch")
+        changed = apply(batch).returning(User.email).cte("changed")
+        statement = select(
+            select(func.max(batch.c.email)).scalar_subquery(),
+            select(func.count()).select_from(batch).scalar_subquery(),
+            select(func.count()).select_from(changed).scalar_subquery(),
+        )
+        async with async_session() as session:
+            last, scanned, affected = (await session.exec(statement)).one()
+            if last is not None:
+                await session.exec(update(Job).where(Job.id == job_id).values(
+                    scanned=Job.scanned + scanned, affected=Job.affected + affected, updated_at=func.now()
+                ))
+            if affected:
+                await commit_users_change(session)
+            else:
+                await session.commit()
+
+        if last is None:
+            return
+        # Let foreground queries through between batches
+        await asyncio.sleep(JOB_BATCH_PAUSE)
+
+
+async def delete_users(job_id: str, where) -> None:
+    """
+    Delete the matching users in batches
+    :param job_id: Job to record progress on
+    :param where: SQL filter, or None for all users
+    """
+    await run_batches(job_id, where, lambda batch: delete(User).where(User.email.in_(select(batch.c.email))))
+
+
+def changed_roles(change: RoleChange):
+    """
+    Build the SQL expression for a user's roles bitmask after a change
+    :param change: Roles to add and remove
+    :return: Integer expression
+    """
+    return mask_expression(User.roles).op('&')(~roles_to_mask(change.remove)).op('|')(roles_to_mask(change.add))
+
+
+async def change_roles(job_id: str, where, change: RoleChange) -> None:
+    """
+    Add and remove roles on the matching users in batches. Users who would be left
+    without any role are skipped.
+    :param job_id: Job to record progress on
+    :param where: SQL filter, or None for all users
+    :param change: Roles to add and remove
+    """
+    roles = changed_roles(change)
+    await run_batches(job_id, where, lambda batch: (
+        update(User)
+        .where(User.email.in_(select(batch.c.email)), roles != mask_expression(User.roles), roles != 0)
+        .values(roles=roles)
+    ))
@@ -1,27 +1,131 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_pagination import add_pagination, set_page
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
     
 from app.pagination import ZeroBasedPage 
-from app.routers import users
+from app.routers import users, jobs, stats
 from app.autogen import init_data
+from app.auth.hashing import hasher, HashingOverloaded
+from app.cache import listing_cache, InvalidationListener
+from app.jobs import job_runner
+from app.config import (SEED_ON_STARTUP, READY_TIMEOUT, CACHE_LISTEN, RECORD_WORKLOAD, DB_POOL_WARM,
+                        READ_DATABASE_URL, PROFILE_SECRET, PROFILE_SAMPLE)
+from app.database import get_engine, get_read_engine, dispose_engines, prewarm
+from app.recorder import WorkloadRecorder
+from app.metrics import MetricsMiddleware, render_metrics, update_pool_gauges
+from app.profiling import ProfilingMiddleware
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Fill the connection pools, calibrate bcrypt and seed, then mark the app ready.
+    Retries on any error, so a failed step cannot leave the app unready for good.
+    """
+    while True:
+        try:
+            warm = [hasher.calibrate(), prewarm(get_engine(), DB_POOL_WARM)]
+            if READ_DATABASE_URL:
+                warm.append(prewarm(get_read_engine(), DB_POOL_WARM))
+            await asyncio.gather(*warm)
+            if SEED_ON_STARTUP:
+                await init_data()
+            break
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("Warm-up failed, retrying: %s", exc)
+            await asyncio.sleep(1)
+        except Exception:
+            logger.exception("Warm-up failed, retrying")
+            await asyncio.sleep(1)
+
+    logger.info("bcrypt work factor %d (%.0f ms per hash)", hasher.rounds, hasher.seconds_per_hash * 1000)
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown. Startup only builds the engines; the app
+    answers right away and GET /ready reports 503 until warm_up has finished.
+    """
+    app.state.ready = False
+    get_engine()
+    get_read_engine()
+    warming = asyncio.create_task(warm_up(app))
+    listener = InvalidationListener(listing_cache)
+    if CACHE_LISTEN and listing_cache.enabled:
+        listener.start()
+    yield
+    warming.cancel()
+    await job_runner.stop()
+    await listener.stop()
+    await dispose_engines()
+    hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 add_pagination(app)
 
 # register custom pagination
 set_page(ZeroBasedPage)
 
+app.include_router(jobs.router)
+app.include_router(stats.router)
 app.include_router(users.router)
 
+if PROFILE_SECRET or PROFILE_SAMPLE:
+    # Inside MetricsMiddleware, whose per-request stats it reads
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+if RECORD_WORKLOAD:
+    app.add_middleware(WorkloadRecorder, path=RECORD_WORKLOAD)
+
 
 @app.get("/")
-async def ping_and_init():
+async def ping():
     """Ping endpoint to check if the service is running"""
-    init_data()
     return {"Hello": "World"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: checks that warm-up is done and the connection pool can serve a query"""
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"detail": "Warming up"})
+
+    async def probe():
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(probe(), READY_TIMEOUT)
+    except (asyncio.TimeoutError, OSError, SQLAlchemyError) as exc:
+        return JSONResponse(status_code=503, content={"detail": str(exc) or "Database not reachable"})
+
+    pool = get_engine().pool
+    return {"status": "ready", "pool": {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    update_pool_gauges(get_engine())
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and eviction counters of the listing cache"""
+    return listing_cache.stats()
+
+
 @app.exception_handler(ValueError)
 async def value_exception_handler(request: Request, exc: ValueError):
     """
@@ -32,6 +136,17 @@ async def value_exception_handler(request: Request, exc: ValueError):
     return JSONResponse(status_code=401, content={"detail": str(exc)})
 
 
+@app.exception_handler(HashingOverloaded)
+async def overloaded_exception_handler(request: Request, exc: HashingOverloaded):
+    """
+    Sheds requests that would queue behind too much hashing work
+    :param request: Request
+    :param exc: HashingOverloaded
+    """
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     """
@@ -0,0 +1,158 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import SLOW_QUERY_MS, SLOW_QUERY_SAMPLE, DB_MAX_OVERFLOW, REQUEST_QUERY_WARN
+
+logger = logging.getLogger("app.slow_query")
+query_count_logger = logging.getLogger("app.query_count")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per request", ["route"]
+)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database query latency")
+QUERY_COUNT = Counter("db_queries_total", "Database queries executed")
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out")
+POOL_SATURATION = Gauge("db_pool_saturation", "Checked out connections / (pool size + max overflow)")
+BCRYPT_LATENCY = Histogram(
+    "bcrypt_duration_seconds", "Time spent in bcrypt", ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2, 5)
+)
+
+
+class RequestStats:
+    """Work attributed to the current request"""
+    __slots__ = ("queries", "db_seconds", "bcrypt_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+        # (statement, seconds) of each query, only collected while profiling
+        self.statements: list[tuple[str, float]] | None = None
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long checkouts wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every statement run by an engine and log the slow ones
+    :param engine: Async engine
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        QUERY_LATENCY.observe(elapsed)
+        QUERY_COUNT.inc()
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+        if elapsed * 1000 >= SLOW_QUERY_MS and random.random() < SLOW_QUERY_SAMPLE:
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+
+
+def observe_bcrypt(operation: str, elapsed: float) -> None:
+    """
+    Record time spent in bcrypt
+    :param operation: "hash" or "verify"
+    :param elapsed: Seconds spent, including the wait for a worker
+    """
+    BCRYPT_LATENCY.labels(operation).observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.bcrypt_seconds += elapsed
+
+
+def update_pool_gauges(engine) -> None:
+    """
+    Refresh pool gauges before a scrape
+    :param engine: Async engine
+    """
+    pool = engine.pool
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(DB_MAX_OVERFLOW, 0)
+    POOL_CHECKED_OUT.set(checked_out)
+    POOL_SATURATION.set(checked_out / capacity if capacity else 0)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format
+    :return: Body and content type
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request and the database work it caused, per route and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_stats.reset(token)
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+            REQUEST_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_TIME.labels(route).observe(stats.db_seconds)
+            if REQUEST_QUERY_WARN and stats.queries > REQUEST_QUERY_WARN:
+                query_count_logger.warning(
+                    "%s %s issued %d queries (%.1f ms), more than REQUEST_QUERY_WARN=%d; possible N+1",
+                    scope["method"], scope["path"], stats.queries, stats.db_seconds * 1000, REQUEST_QUERY_WARN
+                )
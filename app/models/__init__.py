@@ -1,2 +1,8 @@
-from app.models.user import User
+from app.models.user import User, UserUpdate
+from app.models.auth import Credentials, Token
+from app.models.bulk import BulkError, BulkResult
+from app.models.table_version import TableVersion
+from app.models.job import Job, JobState, RoleChange
 from app.models.consts import ZONE, Criteria
+from app.models.roles import ROLES, RoleMask
+from app.models.stats import UserRoleCount, UserDomainCount, UserHourCount, UserStats
@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel
+
+
+class Credentials(SQLModel):
+    """Login request body"""
+    email: str
+    password: str
+
+
+class Token(SQLModel):
+    """Issued access token"""
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
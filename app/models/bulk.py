@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel
+
+
+class BulkError(SQLModel):
+    """Rejected row of a bulk import"""
+    line: int
+    error: str
+
+
+class BulkResult(SQLModel):
+    """Outcome of a bulk import"""
+    inserted: int = 0
+    failed: int = 0
+    errors: list[BulkError] = []
@@ -0,0 +1,50 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from pydantic import model_serializer
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import BigInteger, DateTime, Enum as SAEnum
+from app.models.roles import RoleList
+
+
+class JobState(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job(SQLModel, table=True):
+    """
+    Background bulk operation and its progress. Stored so any worker can report it;
+    progress is written in the same transaction as each batch.
+    """
+    id: str = Field(primary_key=True)
+    kind: str
+    state: JobState = Field(default=JobState.PENDING, sa_column=Column(
+        SAEnum(JobState, native_enum=False, length=16, values_callable=lambda states: [s.value for s in states]),
+        nullable=False
+    ))
+    criteria: Optional[str] = None
+    value: Optional[str] = None
+    estimated_rows: Optional[int] = Field(default=None, sa_column=Column(BigInteger))
+    scanned: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    affected: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    error: Optional[str] = None
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    # Last progress write, so a job left behind by a crashed worker shows as stale
+    updated_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+
+    @model_serializer(mode='wrap')
+    def serialize_model(self, handler):
+        # Rows loaded from the database keep their attributes in load order
+        data = handler(self)
+        return {name: data.get(name) for name in type(self).model_fields}
+
+
+class RoleChange(SQLModel):
+    """Roles to add to and remove from every matching user"""
+    add: RoleList = []
+    remove: RoleList = []
@@ -0,0 +1,80 @@
+from typing import Annotated, Iterable
+from pydantic import AfterValidator
+from sqlalchemy import Integer, literal_column, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+# Role registry: a role's position is its bit in User.roles. Only ever append;
+# reordering or removing a name reassigns the stored bits. A new role also needs a
+# migration adding its partial index (see User.__table_args__) and statistics.
+ROLES = ("user", "admin", "editor", "viewer", "moderator", "guest")
+ROLE_BITS = {name: 1 << position for position, name in enumerate(ROLES)}
+
+
+def check_roles(roles: list[str]) -> list[str]:
+    """
+    Reject roles that are not in the registry
+    :param roles: Role names
+    :return: The same roles
+    """
+    unknown = [role for role in roles if role not in ROLE_BITS]
+    if unknown:
+        raise ValueError(f"Unknown role: {', '.join(unknown)}")
+    return roles
+
+
+# list[str] restricted to registered roles
+RoleList = Annotated[list[str], AfterValidator(check_roles)]
+
+
+def roles_to_mask(roles: Iterable[str]) -> int:
+    """
+    :param roles: Registered role names
+    :return: Bitmask of the roles
+    """
+    mask = 0
+    for role in check_roles(list(roles)):
+        mask |= ROLE_BITS[role]
+    return mask
+
+
+def mask_to_roles(mask: int) -> list[str]:
+    """
+    :param mask: Bitmask of roles
+    :return: Role names in registry order
+    """
+    return [name for name, bit in ROLE_BITS.items() if mask & bit]
+
+
+def mask_expression(column):
+    """
+    :param column: Roles column or expression
+    :return: The same expression typed as a plain integer, for bitwise operators
+    """
+    return type_coerce(column, Integer)
+
+
+def has_role(column, role: str):
+    """
+    Build `column & bit <> 0` with literals rather than parameters, so the planner
+    can match the role's partial index
+    :param column: Roles column or expression
+    :param role: Registered role name
+    :return: SQL expression
+    """
+    return mask_expression(column).op('&')(literal_column(str(ROLE_BITS[role]))) != literal_column('0')
+
+
+class RoleMask(TypeDecorator):
+    """Stores a list of role names as an integer bitmask"""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return roles_to_mask(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return mask_to_roles(value)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import BigInteger, DateTime, Index, Integer, text
+
+
+class UserRoleCount(SQLModel, table=True):
+    """Users per roles bitmask, kept current by triggers on the user table"""
+    __tablename__ = "user_role_count"
+
+    roles: int = Field(sa_column=Column(Integer, primary_key=True, autoincrement=False))
+    users: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+
+class UserDomainCount(SQLModel, table=True):
+    """Users per email domain, kept current by triggers on the user table"""
+    __tablename__ = "user_domain_count"
+    __table_args__ = (
+        Index('ix_user_domain_count_users', text('users DESC')),
+    )
+
+    domain: str = Field(primary_key=True)
+    users: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+
+class UserHourCount(SQLModel, table=True):
+    """Registrations per UTC hour, kept current by triggers on the user table"""
+    __tablename__ = "user_hour_count"
+
+    hour: datetime = Field(sa_column=Column(DateTime(timezone=True), primary_key=True))
+    users: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+
+class UserStats(SQLModel):
+    """Aggregate user counts"""
+    total: int
+    roles: dict[str, int]
+    domains: dict[str, int]
+    registeredLast24h: int
+    registrationsByHour: dict[str, int]
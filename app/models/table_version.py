@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import BigInteger
+
+
+class TableVersion(SQLModel, table=True):
+    """Change counter per table, bumped by a trigger after every write statement"""
+    __tablename__ = "table_version"
+
+    name: str = Field(primary_key=True)
+    version: int = Field(sa_column=Column(BigInteger, nullable=False, server_default="0"))
@@ -1,22 +1,38 @@
 from sqlmodel import SQLModel, Field, Column
-from sqlalchemy import DateTime, ARRAY, String
+from sqlalchemy import DateTime, String, Computed, Index, func, text
+from sqlalchemy.orm import column_property
 from typing import Optional
 from datetime import datetime
 from pydantic import field_serializer, model_serializer
 from app.models.consts import ZONE
+from app.models.roles import ROLES, RoleList, RoleMask, has_role
 
 
 class User(SQLModel, table=True):
     """Database model for User"""
+    __table_args__ = (
+        Index('ix_user_registrationTimestamp', text('"registrationTimestamp" DESC'), text('email DESC')),
+        # Trigram indexes for substring search (pg_trgm)
+        Index('ix_user_email_trgm', 'email', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}),
+        Index('ix_user_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        # Prefix search in index order, the exact email first
+        Index('ix_user_email_lower', text('lower(email) COLLATE "C"')),
+        Index('ix_user_name_lower', text('lower(name) COLLATE "C"')),
+        # One partial index per role, in listing order, matched by has_role()
+        *(Index(f'ix_user_role_{role}', text('"registrationTimestamp" DESC'), text('email DESC'),
+                postgresql_where=has_role(text('roles'), role))
+          for role in ROLES),
+    )
+
     email: str = Field(default=None, primary_key=True)
     name: str
     password: str
     registrationTimestamp: Optional[datetime] = Field(
         default_factory=lambda: datetime.now(ZONE),
-        sa_column=Column(DateTime(timezone=True))
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
-    roles: list[str] = Field(sa_column=Column(ARRAY(String)))
-    
+    # Bitmask of registered roles in the database, a list of names everywhere else
+    roles: RoleList = Field(sa_column=Column(RoleMask(), nullable=False))
     @field_serializer('registrationTimestamp')
     def serialize_timestamp(self, value: datetime) -> str:
         if value:
@@ -36,3 +52,21 @@ class User(SQLModel, table=True):
 
     class Config:
         arbitrary_types_allowed = True
+
+
+# Maintained by PostgreSQL and never written by the app, so it is mapped as a table
+# column only: not a model field, it cannot be sent in request bodies.
+User.__table__.append_column(
+    Column("emailDomain", String, Computed("split_part(email, '@', 2)", persisted=True))
+)
+User.__mapper__.add_property("emailDomain", column_property(User.__table__.c.emailDomain))
+# In listing order, so a domain's pages are read without sorting its users
+Index('ix_user_emailDomain', User.__table__.c.emailDomain,
+      text('"registrationTimestamp" DESC'), text('email DESC'))
+
+
+class UserUpdate(SQLModel):
+    """Fields a client may change with a partial update; omitted fields are left as is"""
+    name: Optional[str] = None
+    password: Optional[str] = None
+    roles: Optional[RoleList] = None
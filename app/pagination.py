@@ -1,8 +1,15 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum
 from typing import TypeVar, Generic
-from fastapi import Query
+from fastapi import HTTPException, Query
 from fastapi_pagination import Page, Params, set_page
 from fastapi_pagination.bases import RawParams
-from pydantic import Field
+from pydantic import BaseModel, Field
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 class ZeroBasedParams(Params):
@@ -22,3 +29,74 @@ T = TypeVar("T")
 class ZeroBasedPage(Page[T], Generic[T]):
     """Page model with 0-indexed page numbers."""
     page: int = Field(ge=0)
+
+
+class CursorParams(BaseModel):
+    """Keyset pagination parameters with an opaque continuation token."""
+    size: int = Query(50, ge=1, le=100, description="Page size")
+    cursor: str | None = Query(None, description="Continuation token from the previous page")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Page of items with the token for the next page, if any."""
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def encode_cursor(timestamp: datetime, email: str) -> str:
+    """
+    Encode a keyset position as an opaque token
+    :param timestamp: Registration timestamp of the last item
+    :param email: Email of the last item
+    :return: URL-safe token
+    """
+    raw = json.dumps([timestamp.isoformat(), email]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> tuple[datetime, str]:
+    """
+    Decode a token produced by encode_cursor
+    :param token: URL-safe token
+    :return: Registration timestamp and email of the last item
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, email = json.loads(raw)
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Registration timestamps are timezone-aware; a naive one cannot be compared with them
+    if not isinstance(email, str) or timestamp.tzinfo is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return timestamp, email
+
+
+class TotalMode(Enum):
+    """How the total row count of a listing is reported."""
+    NONE = "none"
+    ESTIMATE = "estimate"
+    EXACT = "exact"
+
+
+async def count_rows(session: AsyncSession, query, mode: TotalMode) -> int | None:
+    """
+    Count the rows a query would return
+    :param session: Database session
+    :param query: Filtered query, without ordering or limits
+    :param mode: EXACT runs COUNT(*), ESTIMATE reads the planner's row estimate
+    :return: Row count, or None for TotalMode.NONE
+    """
+    if mode == TotalMode.EXACT:
+        return (await session.exec(select(func.count()).select_from(query.subquery()))).one()
+
+    if mode == TotalMode.ESTIMATE:
+        conn = await session.connection()
+        compiled = query.compile(dialect=conn.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    return None
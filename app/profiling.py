@@ -0,0 +1,166 @@
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qsl
+from app.config import PROFILE_SECRET, PROFILE_SAMPLE, PROFILE_DIR, PROFILE_INTERVAL_MS
+from app.metrics import RequestStats, request_stats
+from app.models.consts import ZONE
+
+# Collapsed stacks kept in a report, most sampled first
+MAX_STACKS = 100
+STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+def frame_label(frame) -> str:
+    """
+    :param frame: Python frame
+    :return: "function (file:line)" with the file shortened to the package path
+    """
+    code = frame.f_code
+    filename = code.co_filename.split("site-packages" + os.sep)[-1].removeprefix(STDLIB)
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the event loop thread from a helper thread. Only samples whose stack
+    passes through `anchor`, the frame of the request's middleware call, belong to
+    the request; the rest are time it spent awaiting (database, bcrypt, other tasks).
+    """
+
+    def __init__(self, anchor, interval: float):
+        self.anchor = anchor
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.waiting = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.anchor = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.anchor:
+                stack.append(frame)
+                frame = frame.f_back
+            if frame is None:
+                self.waiting += 1
+            else:
+                self.stacks[tuple(frame_label(f) for f in reversed(stack))] += 1
+
+    def report(self) -> dict:
+        """Samples as collapsed stacks ("outer;inner": count), as read by flame graph tools"""
+        return {
+            "interval_ms": self.interval * 1000,
+            "running_samples": sum(self.stacks.values()),
+            "waiting_samples": self.waiting,
+            "stacks": {";".join(stack) or "(middleware)": count
+                       for stack, count in self.stacks.most_common(MAX_STACKS)},
+        }
+
+
+def profiling_requested(scope) -> bool:
+    """
+    :param scope: ASGI scope
+    :return: True if the request carries the profiling secret or is sampled
+    """
+    if PROFILE_SECRET:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, PROFILE_SECRET.encode('utf-8'))
+    return PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE
+
+
+def write_report(path: str, report: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected requests: a sampling profile of the event
+    loop, every SQL statement with its time, and time spent in bcrypt. Each report
+    is written to PROFILE_DIR and named in the X-Profile-Report response header.
+    Install it inside MetricsMiddleware, which tracks the request's work.
+    """
+
+    def __init__(self, app, directory: str = PROFILE_DIR, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.app = app
+        self.directory = directory
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = request_stats.set(stats)
+        stats.statements = []
+        queries, db_seconds, bcrypt_seconds = stats.queries, stats.db_seconds, stats.bcrypt_seconds
+
+        started = datetime.now(ZONE)
+        name = f"{started:%Y%m%dT%H%M%S}-{scope['method']}-{uuid.uuid4().hex[:8]}.json"
+        status = 500
+
+        async def send_with_report(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-report", name.encode('ascii'))]
+            await send(message)
+
+        sampler = StackSampler(sys._getframe(), self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop()
+            statements, stats.statements = stats.statements, None
+            if token is not None:
+                request_stats.reset(token)
+
+            route = scope.get("route")
+            report = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "query": {key: "***" if key == "password" else value
+                          for key, value in parse_qsl(scope["query_string"].decode('latin-1'))},
+                "status": status,
+                "started": started.isoformat(timespec='milliseconds'),
+                "duration_ms": round(duration * 1000, 3),
+                "queries": stats.queries - queries,
+                "db_ms": round((stats.db_seconds - db_seconds) * 1000, 3),
+                "bcrypt_ms": round((stats.bcrypt_seconds - bcrypt_seconds) * 1000, 3),
+                "statements": [{"sql": " ".join(sql.split()), "ms": round(seconds * 1000, 3)}
+                               for sql, seconds in statements],
+                "profile": sampler.report(),
+            }
+            await asyncio.to_thread(write_report, os.path.join(self.directory, name), report)
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import time
+from urllib.parse import parse_qsl
+
+# Bodies larger than this (e.g. bulk uploads) are not recorded
+MAX_RECORDED_BODY = 64 * 1024
+# Recorded in place of every password; benchmarks.loadtest --password fills it in
+REDACTED = "<redacted>"
+
+
+def redact(value):
+    """
+    :param value: Parsed JSON value
+    :return: The value with every "password" member replaced by REDACTED
+    """
+    if isinstance(value, dict):
+        return {key: REDACTED if key == "password" else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def redact_content(content: str, content_type: str) -> str:
+    """
+    Redact passwords in an NDJSON or CSV body, line by line
+    :param content: Body text
+    :param content_type: Media type of the body
+    :return: Body text without passwords
+    """
+    if content_type.startswith("text/csv"):
+        rows = list(csv.reader(io.StringIO(content)))
+        if rows and "password" in rows[0]:
+            column = rows[0].index("password")
+            for row in rows[1:]:
+                if column < len(row):
+                    row[column] = REDACTED
+        output = io.StringIO()
+        csv.writer(output, lineterminator="\n").writerows(rows)
+        return output.getvalue()
+
+    lines = []
+    for line in content.splitlines():
+        try:
+            lines.append(json.dumps(redact(json.loads(line))))
+        except ValueError:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class WorkloadRecorder:
+    """
+    ASGI middleware appending each HTTP request to a JSONL workload file, in the
+    format replayed by benchmarks.loadtest:
+    {"method", "path", "query", "body" | "content", "content_type", "route", "think_ms"}
+    Passwords in the query and body are recorded as REDACTED.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+        self._last_start: float | None = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        think_ms = 0.0 if self._last_start is None else (start - self._last_start) * 1000
+        self._last_start = start
+        chunks: list[bytes] = []
+        size = 0
+
+        async def recording_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= MAX_RECORDED_BODY:
+                    chunks.append(body)
+            return message
+
+        await self.app(scope, recording_receive, send)
+
+        entry = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": redact(dict(parse_qsl(scope["query_string"].decode('latin-1')))),
+            "think_ms": round(think_ms, 3),
+        }
+        route = scope.get("route")
+        if route is not None:
+            entry["route"] = route.path
+
+        if chunks and size <= MAX_RECORDED_BODY:
+            headers = dict(scope["headers"])
+            content_type = headers.get(b"content-type", b"").decode('latin-1')
+            content = b"".join(chunks).decode('utf-8', errors='replace')
+            try:
+                if not content_type.startswith("application/json"):
+                    raise ValueError(content_type)
+                entry["body"] = redact(json.loads(content))
+            except ValueError:
+                entry["content"] = redact_content(content, content_type)
+                entry["content_type"] = content_type
+
+        self._file.write(json.dumps(entry) + "\n")
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_session, mark_write
+from app.filters import criteria_filter
+from app.jobs import job_runner, delete_users, change_roles
+from app.models.consts import Criteria
+from app.models.job import Job, RoleChange
+
+router = APIRouter(prefix="/users/jobs", tags=["jobs"])
+
+
+@router.post("/delete", status_code=202, dependencies=[Depends(mark_write)])
+async def delete_users_job(criteria: Criteria | None = None, value: str | None = None) -> Job:
+    """
+    Delete every user matching the criteria in the background, in short batches
+    :param criteria: Criteria to filter users, all users when omitted
+    :param value: Value for the criteria
+    :return: Queued job; poll GET /users/jobs/{id} for progress
+    """
+    where = criteria_filter(criteria, value)
+    return await job_runner.submit("delete", criteria, value, lambda job_id: delete_users(job_id, where))
+
+
+@router.post("/roles", status_code=202, dependencies=[Depends(mark_write)])
+async def change_roles_job(change: RoleChange, criteria: Criteria | None = None,
+                           value: str | None = None) -> Job:
+    """
+    Add and remove roles on every user matching the criteria in the background
+    :param change: Roles to add and remove
+    :param criteria: Criteria to filter users, all users when omitted
+    :param value: Value for the criteria
+    :return: Queued job; poll GET /users/jobs/{id} for progress
+    """
+    if not change.add and not change.remove:
+        raise HTTPException(status_code=400, detail="No roles to add or remove")
+
+    where = criteria_filter(criteria, value)
+    return await job_runner.submit("roles", criteria, value, lambda job_id: change_roles(job_id, where, change))
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, session: AsyncSession = Depends(get_session)) -> Job:
+    """
+    Get the state and progress of a background job, from any worker
+    :param job_id: Job id
+    :param session: Database session
+    :return: Job
+    """
+    job = await session.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
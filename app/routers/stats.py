@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_read_session
+from app.models.stats import UserStats
+from app.stats import read_stats
+
+router = APIRouter(prefix="/users/stats", tags=["stats"])
+
+
+@router.get("")
+async def get_stats(domains: int = Query(10, ge=0, le=100),
+                    session: AsyncSession = Depends(get_read_session)) -> UserStats:
+    """
+    User counts per role, the largest email domains and recent registrations,
+    read from counters maintained by triggers instead of scanning users
+    :param domains: Number of largest email domains to include
+    :param session: Database session
+    :return: User statistics
+    """
+    return await read_stats(session, domains)
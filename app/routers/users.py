@@ -1,120 +1,357 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import func
-from sqlalchemy.orm import defer
-from sqlmodel import Session, delete, select
-from datetime import datetime, timedelta
-from fastapi_pagination.ext.sqlmodel import paginate
-from app.pagination import ZeroBasedParams
-from app.models.user import User
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_, update
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime
+from app.pagination import (ZeroBasedParams, CursorParams, CursorPage, TotalMode, encode_cursor,
+                            decode_cursor, count_rows)
+from app.filters import criteria_filter, search_candidates
+from app.serialization import PUBLIC_COLUMNS, dumps, encode_users, public_dict
+from app.cache import listing_cache, commit_users_change
+from app.models.user import User, UserUpdate
 from app.models.consts import ZONE, Criteria
-from app.database import get_session
-from app.auth.utils import authenticate_user, hash_user_password
+from app.database import (get_session, get_write_session, get_read_session, read_router, is_sticky,
+                          mark_write, replica_settle)
+from fastapi.security import HTTPAuthorizationCredentials
+from app.models.auth import Credentials, Token
+from app.models.bulk import BulkResult
+from app.bulk import import_users
+from app.export import ExportFormat, MEDIA_TYPES, export_users
+from app.auth.tokens import bearer, issue_token
+from app.auth.utils import (authenticate_user, authorize_user, authorize_row, hash_user_password,
+                            verify_user_token, check_token_password)
+from app.etags import ROW_VERSION, make_etag, etag_matches, users_version, time_window
+from app.config import CACHE_TTL, SEARCH_CANDIDATES
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("", response_model_exclude={"password"})
-async def create_user(to_upload: User, session: Session = Depends(get_session)) -> User:
+async def create_user(to_upload: User, session: AsyncSession = Depends(get_write_session)) -> User:
     """
     Upload a new user
     :param to_upload: User to upload
     :param session: Database session
     :return: Uploaded User
     """
-    to_upload.password = hash_user_password(to_upload.password)
+    to_upload.password = await hash_user_password(to_upload.password)
     to_upload.registrationTimestamp = datetime.now(ZONE)
-    user = User(**to_upload.model_dump())
+    user = User.model_validate(to_upload.model_dump())
     
     if not user.roles:
         raise ValueError("User must have at least one role")
     
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await commit_users_change(session)
+    await session.refresh(user)
     return user
 
 
+@router.post("/bulk")
+async def bulk_create_users(request: Request, session: AsyncSession = Depends(get_write_session)) -> BulkResult:
+    """
+    Upload many users from a streamed NDJSON or CSV body (one user per line).
+    Valid rows are inserted in chunks; invalid ones are reported by line number.
+    :param request: Request whose body is streamed
+    :param session: Database session
+    :return: Import summary
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    return await import_users(request.stream(), content_type, session)
+
+
+@router.post("/login")
+async def login(credentials: Credentials, request: Request,
+                session: AsyncSession = Depends(get_session)) -> Token:
+    """
+    Check a user's password once and issue a short-lived access token
+    :param credentials: User email and password
+    :param request: Request, used for the client address
+    :param session: Database session
+    :return: Access token
+    """
+    user = await authenticate_user(credentials.email, credentials.password, session,
+                                   request.client and request.client.host)
+    return issue_token(user)
+
+
+@router.get("/cursor", response_model_exclude_none=True)
+async def get_users_by_cursor(session: AsyncSession = Depends(get_read_session),
+                              criteria: Criteria | None = None, value: str | None = None,
+                              params: CursorParams = Depends()) -> CursorPage[User]:
+    """
+    Get users based on criteria using keyset pagination
+    :param session: Database session
+    :param criteria: Criteria to filter users
+    :param value: Value for the criteria
+    :param params: Cursor pagination parameters
+    :return: Page of Users and the cursor of the next page
+    """
+    cache_key = ("cursor", criteria, value, params.size, params.cursor)
+    content = None if session.info["sticky"] else listing_cache.get(cache_key)
+    if content is not None:
+        return Response(content=content, media_type="application/json")
+
+    version = listing_cache.version
+    query = select(*PUBLIC_COLUMNS)
+    where = criteria_filter(criteria, value)
+    if where is not None:
+        query = query.where(where)
+
+    if params.cursor:
+        timestamp, email = decode_cursor(params.cursor)
+        query = query.where(tuple_(User.registrationTimestamp, User.email) < tuple_(timestamp, email))
+
+    query = query.order_by(User.registrationTimestamp.desc(), User.email.desc()).limit(params.size + 1)
+    rows = (await session.exec(query)).all()
+
+    next_cursor = None
+    if len(rows) > params.size:
+        rows = rows[:params.size]
+        email, _, timestamp, _ = rows[-1]
+        next_cursor = encode_cursor(timestamp, email)
+
+    content = dumps({"items": [public_dict(row) for row in rows], "next_cursor": next_cursor})
+    listing_cache.set(cache_key, content, version, replica_settle(session))
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/search", response_model_exclude_none=True)
+async def search_users(request: Request, q: str, session: AsyncSession = Depends(get_read_session),
+                       params: ZeroBasedParams = Depends()) -> list[User]:
+    """
+    Find users whose name or email contains the text, case-insensitively. Exact email
+    matches come first, then email and name prefixes, then other matches, each by
+    email. Each kind of match is capped at SEARCH_CANDIDATES through its index;
+    X-Search-Truncated tells when some were left out. Pages, caching and the ETag
+    work as in get_users.
+    :param request: Request, used for If-None-Match
+    :param q: Text to search for, at least SEARCH_MIN_LENGTH characters
+    :param session: Database session
+    :param params: Pagination parameters
+    :return: List of Users
+    """
+    candidates = search_candidates(q, SEARCH_CANDIDATES)
+    if_none_match = request.headers.get("if-none-match")
+    cache_key = ("search", q, params.page, params.size)
+    cached = None if session.info["sticky"] else listing_cache.get(cache_key)
+    if cached is not None:
+        content, headers = cached
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers={"ETag": headers["ETag"]})
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    version = listing_cache.version
+    etag = make_etag("search", await users_version(session), *cache_key[1:])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    raw_params = params.to_raw_params()
+    query = (
+        select(*(candidates.c[column.key] for column in PUBLIC_COLUMNS), candidates.c.truncated)
+        .order_by(candidates.c.rank, candidates.c.email)
+        .offset(raw_params.offset)
+        .limit(raw_params.limit + 1)
+    )
+    rows = (await session.exec(query)).all()
+
+    headers = {
+        "ETag": etag,
+        "X-Has-Next": "true" if len(rows) > raw_params.limit else "false",
+        "X-Search-Truncated": "true" if rows and rows[0].truncated else "false",
+    }
+    content = encode_users(row[:-1] for row in rows[:raw_params.limit])
+    listing_cache.set(cache_key, (content, headers), version, replica_settle(session))
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@router.get("/export")
+async def export_all_users(request: Request, criteria: Criteria | None = None, value: str | None = None,
+                           export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format")) -> StreamingResponse:
+    """
+    Stream every user matching the criteria as NDJSON or CSV, without passwords.
+    Runs on the read replica when there is one.
+    :param request: Request, used for the read-your-writes cookie
+    :param criteria: Criteria to filter users
+    :param value: Value for the criteria
+    :param export_format: Output format
+    :return: Streaming response
+    """
+    where = criteria_filter(criteria, value)
+    conn = await read_router.connect(is_sticky(request))
+    return StreamingResponse(export_users(where, export_format, conn), media_type=MEDIA_TYPES[export_format])
+
+
 @router.get("/{email}", response_model_exclude={"password"})
-async def get_specific_user(email: str, password: str,
-                            session: Session = Depends(get_session)) -> User:
+async def get_specific_user(email: str, request: Request, password: str | None = None,
+                            auth: HTTPAuthorizationCredentials | None = Depends(bearer),
+                            session: AsyncSession = Depends(get_read_session)) -> User:
     """
-    Get a specific user by email
+    Get a specific user by email. The response carries an ETag built from the row's
+    version; a matching If-None-Match gets 304 without the user being serialized.
     :param email: User email
-    :param password: User password
+    :param request: Request, used for the client address and If-None-Match
+    :param password: User password, optional when a bearer token is sent
+    :param auth: Bearer access token
     :param session: Database session
     :return: User
     """
-    user = authenticate_user(email, password, session)
-    return user
+    row = await authorize_row(email, session, (*PUBLIC_COLUMNS, ROW_VERSION), password,
+                              auth and auth.credentials, request.client and request.client.host)
+    etag = make_etag("user", email, row.row_version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(content=dumps(public_dict(row[:len(PUBLIC_COLUMNS)])), media_type="application/json",
+                    headers={"ETag": etag})
 
 
 @router.put("/{email}", status_code=204)
-async def update_user(email: str, to_update: User, password: str,
-                      session: Session = Depends(get_session)):
+async def update_user(email: str, to_update: User, request: Request, password: str | None = None,
+                      auth: HTTPAuthorizationCredentials | None = Depends(bearer),
+                      session: AsyncSession = Depends(get_write_session)):
     """
-    Update a specific user by email
+    Update a specific user by email. Changing the password revokes all issued tokens.
     :param email: User email
     :param to_update: User data to update
-    :param password: User password
+    :param request: Request, used for the client address
+    :param password: User password, optional when a bearer token is sent
+    :param auth: Bearer access token
     :param session: Database session
     """
-    user = authenticate_user(email, password, session)
+    user = await authorize_user(email, session, password, auth and auth.credentials,
+                                request.client and request.client.host)
 
     for key, value in to_update.model_dump().items():
         if key not in ["email", "registrationTimestamp"] and value is not None:
             if key == "password":
-                value = hash_user_password(value)
+                value = await hash_user_password(value)
             elif key == "roles" and not value:
                 raise ValueError("User must have at least one role")
             setattr(user, key, value)
 
     session.add(user)
-    session.commit()
+    await commit_users_change(session)
+
+
+@router.patch("/{email}")
+async def patch_user(email: str, to_update: UserUpdate, request: Request, password: str | None = None,
+                     auth: HTTPAuthorizationCredentials | None = Depends(bearer),
+                     session: AsyncSession = Depends(get_session)) -> Response:
+    """
+    Update only the fields sent, in a single UPDATE ... RETURNING. With a bearer token
+    no SELECT runs: the stored hash the token is checked against comes back from the
+    UPDATE itself, and the change is rolled back if the token is stale.
+    :param email: User email
+    :param to_update: Fields to change
+    :param request: Request, used for the client address
+    :param password: User password, optional when a bearer token is sent
+    :param auth: Bearer access token
+    :param session: Database session
+    :return: Updated user
+    """
+    token = auth and auth.credentials
+    if token:
+        payload = verify_user_token(email, token)
+    else:
+        await authorize_user(email, session, password, client=request.client and request.client.host)
+
+    values = to_update.model_dump(exclude_unset=True, exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if "roles" in values and not values["roles"]:
+        raise ValueError("User must have at least one role")
+    if "password" in values:
+        values["password"] = await hash_user_password(values["password"])
+
+    old = select(User.email, User.password).where(User.email == email).with_for_update().subquery()
+    statement = (
+        update(User).where(User.email == old.c.email).values(**values)
+        .returning(*PUBLIC_COLUMNS, old.c.password.label("old_password"))
+    )
+    row = (await session.execute(statement)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if token:
+        try:
+            check_token_password(payload, row.old_password)
+        except ValueError:
+            await session.rollback()
+            raise
+
+    await commit_users_change(session)
+    response = Response(content=dumps(public_dict(row[:-1])), media_type="application/json")
+    mark_write(response)
+    return response
 
 
 @router.get("/", response_model_exclude_none=True)
-async def get_users(session: Session = Depends(get_session),
+async def get_users(request: Request, session: AsyncSession = Depends(get_read_session),
                     criteria: Criteria | None = None, value: str | None = None,
-                    params: ZeroBasedParams = Depends()) -> list[User]:
+                    params: ZeroBasedParams = Depends(),
+                    total: TotalMode = TotalMode.NONE) -> list[User]:
     """
-    Get users based on criteria
+    Get users based on criteria. No COUNT runs unless asked for: X-Has-Next tells
+    whether another page exists, and total=estimate|exact adds X-Total-Count.
+    Rows are selected as tuples of the public columns and encoded directly; encoded
+    pages are cached until the next write. The ETag follows the user table's change
+    counter, so a matching If-None-Match costs one single-row lookup at most.
+    :param request: Request, used for If-None-Match
     :param session: Database session
     :param criteria: Criteria to filter users
     :param value: Value for the criteria
     :param params: Pagination parameters
+    :param total: How to report the total number of matching users
     :return: List of Users
     """
-    if not criteria:
-        query=select(User)
+    if_none_match = request.headers.get("if-none-match")
+    cache_key = ("list", criteria, value, params.page, params.size, total)
+    cached = None if session.info["sticky"] else listing_cache.get(cache_key)
+    if cached is not None:
+        content, headers = cached
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers={"ETag": headers["ETag"]})
+        return Response(content=content, media_type="application/json", headers=headers)
 
-    elif not value and criteria != Criteria.REGISTERATION_TODAY:
-        raise HTTPException(status_code=400, detail="Value is required for the specified criteria")
+    where = criteria_filter(criteria, value)
+    version = listing_cache.version
+    parts = cache_key[1:]
+    if criteria == Criteria.REGISTERATION_TODAY:
+        # Users leave the window without any write; go stale no later than the cache
+        parts += (time_window(CACHE_TTL or 1),)
+    etag = make_etag("list", await users_version(session), *parts)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
 
-    elif criteria == Criteria.ROLE:
-        query=select(User).where(User.roles.any(value))
+    query = select(*PUBLIC_COLUMNS)
+    if where is not None:
+        query = query.where(where)
 
-    elif criteria == Criteria.EMAIL_DOMAIN:
-        domain_pattern = f"%@{value}"
-        query=select(User).where(User.email.like(domain_pattern))
+    raw_params = params.to_raw_params()
+    page_query = (
+        query.order_by(User.registrationTimestamp.desc(), User.email.desc())
+        .offset(raw_params.offset)
+        .limit(raw_params.limit + 1)
+    )
+    rows = (await session.exec(page_query)).all()
 
-    elif criteria == Criteria.REGISTERATION_TODAY:
-        last_24_hours = datetime.now(tz=ZONE) - timedelta(hours=24)
-        
-        query=select(User).where(User.registrationTimestamp >= last_24_hours)
-    else:
-        raise HTTPException(status_code=400, detail="Invalid criteria")
-    
-    query = query.options(defer(User.password)).order_by(User.registrationTimestamp.desc())
-    page = paginate(query=query, params=params, session=session)
+    headers = {"ETag": etag, "X-Has-Next": "true" if len(rows) > raw_params.limit else "false"}
+    if total != TotalMode.NONE:
+        headers["X-Total-Count"] = str(await count_rows(session, query, total))
+        headers["X-Total-Estimated"] = "true" if total == TotalMode.ESTIMATE else "false"
 
-    return page.items
+    content = encode_users(rows[:raw_params.limit])
+    listing_cache.set(cache_key, (content, headers), version, replica_settle(session))
+    return Response(content=content, media_type="application/json", headers=headers)
 
 
 @router.delete("/", status_code=204)
-async def delete_all_users(session: Session = Depends(get_session)):
+async def delete_all_users(session: AsyncSession = Depends(get_write_session)):
     """
     Delete all users
     :param session: Database session
     """
-    session.exec(delete(User))
-    session.commit()
+    await session.exec(delete(User))
+    await commit_users_change(session)
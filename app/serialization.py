@@ -0,0 +1,45 @@
+import orjson
+from app.models.consts import ZONE
+from app.models.user import User
+
+# Columns exposed by the API, in response order. Listings select these as plain
+# tuples and encode them directly, skipping ORM hydration and model validation.
+PUBLIC_FIELDS = ("email", "name", "registrationTimestamp", "roles")
+PUBLIC_COLUMNS = tuple(getattr(User, field) for field in PUBLIC_FIELDS)
+
+
+def format_timestamp(value) -> str | None:
+    """
+    Format a timestamp the same way the User serializer does
+    :param value: Registration timestamp
+    :return: ISO 8601 string in the local zone
+    """
+    return value.astimezone(ZONE).isoformat(timespec='milliseconds') if value else None
+
+
+def public_dict(row) -> dict:
+    """
+    Turn a row of PUBLIC_COLUMNS into the API representation of a user
+    :param row: (email, name, registrationTimestamp, roles)
+    :return: User as a dict, without password
+    """
+    email, name, timestamp, roles = row
+    return {"email": email, "name": name, "registrationTimestamp": format_timestamp(timestamp), "roles": roles}
+
+
+def dumps(data) -> bytes:
+    """
+    Encode data as JSON bytes
+    :param data: JSON-serializable data
+    :return: UTF-8 encoded JSON
+    """
+    return orjson.dumps(data)
+
+
+def encode_users(rows) -> bytes:
+    """
+    Encode rows of PUBLIC_COLUMNS as a JSON array
+    :param rows: Rows of PUBLIC_COLUMNS
+    :return: UTF-8 encoded JSON
+    """
+    return orjson.dumps([public_dict(row) for row in rows])
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_session, dispose_engines
+from app.models.roles import ROLE_BITS
+from app.models.stats import UserRoleCount, UserDomainCount, UserHourCount, UserStats
+from app.models.user import User
+from app.serialization import format_timestamp
+
+HOUR = func.date_trunc('hour', User.registrationTimestamp, 'UTC')
+
+
+def start_of_hour(moment: datetime) -> datetime:
+    """
+    :param moment: Aware timestamp
+    :return: Start of its UTC hour
+    """
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+async def read_stats(session: AsyncSession, domains: int, now: datetime | None = None) -> UserStats:
+    """
+    Read the aggregate counters. The cost depends on the number of role
+    combinations, `domains` and one hour of registrations, not on the number of users.
+    :param session: Database session
+    :param domains: Number of largest email domains to include
+    :param now: Current time, for the last 24 hours window
+    :return: User statistics
+    """
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(hours=24)
+    boundary = start_of_hour(since)
+
+    masks = (await session.exec(select(UserRoleCount.roles, UserRoleCount.users))).all()
+    top_domains = (await session.exec(
+        select(UserDomainCount.domain, UserDomainCount.users)
+        .where(UserDomainCount.users > 0).order_by(UserDomainCount.users.desc()).limit(domains)
+    )).all()
+    hours = (await session.exec(
+        select(UserHourCount.hour, UserHourCount.users)
+        .where(UserHourCount.hour > boundary, UserHourCount.users > 0).order_by(UserHourCount.hour)
+    )).all()
+    # The hour the window starts in only partly counts; count it from the table
+    partial = (await session.exec(
+        select(func.count()).select_from(User)
+        .where(User.registrationTimestamp >= since, User.registrationTimestamp < boundary + timedelta(hours=1))
+    )).one()
+
+    return UserStats(
+        total=sum(users for _, users in masks),
+        roles={role: sum(users for mask, users in masks if mask & bit) for role, bit in ROLE_BITS.items()},
+        domains=dict(top_domains),
+        registeredLast24h=partial + sum(users for _, users in hours),
+        registrationsByHour={format_timestamp(hour): users for hour, users in hours},
+    )
+
+
+async def rebuild_stats(session: AsyncSession) -> dict[str, int]:
+    """
+    Recompute every counter from the user table. Writes to the table wait until
+    this transaction commits, so no change is missed or counted twice.
+    :param session: Database session
+    :return: Counter rows that were wrong, per counter table
+    """
+    await session.execute(text('LOCK TABLE "user" IN SHARE MODE'))
+    counters = (
+        (UserRoleCount, UserRoleCount.roles, select(User.roles, func.count()).group_by(User.roles)),
+        (UserDomainCount, UserDomainCount.domain,
+         select(User.emailDomain, func.count()).group_by(User.emailDomain)),
+        (UserHourCount, UserHourCount.hour,
+         select(HOUR, func.count()).where(User.registrationTimestamp.is_not(None)).group_by(HOUR)),
+    )
+
+    drift = {}
+    for model, key, counts in counters:
+        before = dict((await session.exec(select(key, model.users).where(model.users != 0))).all())
+        await session.exec(delete(model))
+        await session.exec(insert(model).from_select([key.name, "users"], counts))
+        after = dict((await session.exec(select(key, model.users))).all())
+        drift[model.__tablename__] = sum(before.get(k) != after.get(k) for k in before.keys() | after.keys())
+
+    await session.commit()
+    return drift
+
+
+async def main():
+    async with async_session() as session:
+        drift = await rebuild_stats(session)
+    for table, wrong in drift.items():
+        print(f"{table}: {wrong} counters corrected")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,10 @@
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile
+    :param samples: Latency samples
+    :param pct: Percentile in [0, 100]
+    :return: Percentile value
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,126 @@
+"""
+Generate synthetic users at benchmark scale and bulk load them with COPY.
+
+Email domains and roles follow weighted distributions, registration
+timestamps are spread over --days with a controllable fraction inside the
+last 24 hours. Roles must be in the registry (app.models.roles) and are
+written as a bitmask. Passwords are drawn from a small pool hashed once up front.
+
+Usage: python -m benchmarks.generate --count 10000000
+       [--domains example.com:50,gmail.com:30,corp.io:20]
+       [--roles user:1,admin:0.02,editor:0.1] [--recent 0.01] [--days 1095]
+"""
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from datetime import datetime, timedelta
+import asyncpg
+import bcrypt
+from app.config import DATABASE_URL
+from app.database import to_dsn
+from app.models.consts import ZONE
+from app.models.roles import roles_to_mask
+
+COLUMNS = ("email", "name", "password", "registrationTimestamp", "roles")
+PASSWORD_POOL = 16
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """
+    Parse "a:1,b:0.5" into {"a": 1.0, "b": 0.5}
+    :param spec: Comma separated name:weight pairs
+    :return: Weights by name
+    """
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition(":")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def password_hashes(count: int) -> list[str]:
+    """
+    Hash a pool of passwords once so generation never runs bcrypt per row
+    :param count: Number of distinct passwords
+    :return: bcrypt hashes of Benchmark0..Benchmark<count-1>
+    """
+    return [bcrypt.hashpw(f"Benchmark{i}".encode('utf-8'), bcrypt.gensalt()).decode('utf-8') for i in range(count)]
+
+
+class UserGenerator:
+    """Produces batches of user records following the configured distributions"""
+
+    def __init__(self, domains: dict[str, float], roles: dict[str, float], recent: float,
+                 days: int, prefix: str, seed: int | None):
+        self.random = random.Random(seed)
+        self.domain_names = list(domains)
+        self.domain_weights = list(domains.values())
+        self.roles = roles
+        self.recent = recent
+        self.prefix = prefix
+        self.now = datetime.now(ZONE)
+        self.span = timedelta(days=days).total_seconds()
+        self.hashes = password_hashes(PASSWORD_POOL)
+
+    def pick_roles(self) -> list[str]:
+        """Each role is assigned independently with its probability; never empty"""
+        roles = [role for role, probability in self.roles.items() if self.random.random() < probability]
+        return roles or [next(iter(self.roles))]
+
+    def pick_timestamp(self) -> datetime:
+        """Timestamp in the last 24 hours with probability `recent`, otherwise older"""
+        if self.random.random() < self.recent:
+            return self.now - timedelta(seconds=self.random.uniform(0, 86_400))
+        return self.now - timedelta(seconds=self.random.uniform(86_400, max(self.span, 86_401)))
+
+    def batch(self, start: int, size: int) -> list[tuple]:
+        """
+        Generate records start..start+size-1
+        :return: Tuples in COLUMNS order
+        """
+        domains = self.random.choices(self.domain_names, self.domain_weights, k=size)
+        return [
+            (
+                f"{self.prefix}{index}@{domain}",
+                f"User {index}",
+                self.hashes[index % PASSWORD_POOL],
+                self.pick_timestamp(),
+                roles_to_mask(self.pick_roles()),
+            )
+            for index, domain in zip(range(start, start + size), domains)
+        ]
+
+
+async def main(args) -> None:
+    generator = UserGenerator(
+        parse_weights(args.domains), parse_weights(args.roles), args.recent, args.days, args.prefix, args.seed
+    )
+    conn = await asyncpg.connect(to_dsn(DATABASE_URL))
+    start = time.perf_counter()
+    try:
+        for offset in range(0, args.count, args.batch):
+            records = generator.batch(offset, min(args.batch, args.count - offset))
+            await conn.copy_records_to_table("user", records=records, columns=COLUMNS)
+            loaded = offset + len(records)
+            print(f"{loaded:>12,} rows  {loaded / (time.perf_counter() - start):>10,.0f} rows/s", flush=True)
+        await conn.execute('ANALYZE "user"')
+    finally:
+        await conn.close()
+    print(f"Loaded {args.count:,} users in {time.perf_counter() - start:.1f}s (prefix {args.prefix!r})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1_000_000, help="number of users")
+    parser.add_argument("--domains", default="example.com:50,gmail.com:30,corp.io:15,tiny.org:5",
+                        help="email domains with relative weights")
+    parser.add_argument("--roles", default="user:1,admin:0.02,editor:0.1",
+                        help="roles with independent assignment probabilities")
+    parser.add_argument("--recent", type=float, default=0.01, help="fraction registered in the last 24 hours")
+    parser.add_argument("--days", type=int, default=1095, help="spread of older registrations in days")
+    parser.add_argument("--batch", type=int, default=50_000, help="rows per COPY")
+    parser.add_argument("--prefix", default=f"gen{secrets.token_hex(3)}_", help="email local-part prefix")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Benchmark bcrypt throughput and tail latency with hashing inline on the
+event loop versus offloaded to the worker pool.
+
+Usage: python -m benchmarks.hashing [--requests 128] [--workers N]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.auth.hashing import PasswordHasher, hash_password_sync
+from app.config import HASH_WORKERS
+from benchmarks.common import percentile
+
+CONCURRENCY_LEVELS = (1, 16, 64)
+PASSWORD = "Benchmark1"
+
+
+async def loop_lag(stop: asyncio.Event, lags: list[float], interval: float = 0.005) -> None:
+    """
+    Measure how late the event loop wakes up, i.e. how long other requests would stall
+    :param stop: Event signalling the end of the run
+    :param lags: Output list of lag samples (ms)
+    :param interval: Sleep interval between samples (s)
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(hash_fn, concurrency: int, total: int) -> tuple[float, float, float, float]:
+    """
+    Issue `total` hash requests with at most `concurrency` in flight
+    :param hash_fn: Coroutine function hashing one password
+    :param concurrency: Number of concurrent clients
+    :param total: Total number of requests
+    :return: Throughput (req/s), p50 and p99 latency (ms), max event loop lag (ms)
+    """
+    latencies: list[float] = []
+    lags: list[float] = [0.0]
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag(stop, lags))
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await hash_fn(PASSWORD)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return total / elapsed, statistics.median(latencies), percentile(latencies, 99), max(lags)
+
+
+async def main(total: int, workers: int) -> None:
+    hasher = PasswordHasher(workers, queue_limit=max(CONCURRENCY_LEVELS))
+    rounds = await hasher.calibrate()
+    print(f"bcrypt rounds: {rounds} ({hasher.seconds_per_hash * 1000:.0f} ms/hash)")
+
+    async def inline_hash(password: str) -> str:
+        """Hash on the event loop, the way the routes used to"""
+        await asyncio.sleep(0)
+        return hash_password_sync(password, rounds)
+
+    print(f"{'mode':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'loop lag ms':>12}")
+    try:
+        for concurrency in CONCURRENCY_LEVELS:
+            for mode, fn in (("inline", inline_hash), ("pool", hasher.hash)):
+                throughput, p50, p99, lag = await run(fn, concurrency, total)
+                print(f"{mode:<8} {concurrency:>5} {throughput:>9.1f} {p50:>9.1f} {p99:>9.1f} {lag:>12.1f}")
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=128, help="requests per concurrency level")
+    parser.add_argument("--workers", type=int, default=HASH_WORKERS, help="hashing worker threads")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.workers))
@@ -0,0 +1,177 @@
+"""
+Replay a JSONL workload against the API and report throughput plus
+p50/p95/p99 latency per route.
+
+Each line is {"method", "path", "query", "body" | "content", "content_type",
+"route", "think_ms"}; only method and path are required. Record real
+traffic in this format by starting the server with RECORD_WORKLOAD=<file>.
+Recorded passwords are redacted; --password sends the given one in their place.
+
+Without --url the app is served in-process, using the database from DB_PATH
+(e.g. the docker-compose PostgreSQL).
+
+Usage: python -m benchmarks.loadtest [workload.jsonl] [--concurrency 16]
+       [--repeat 1] [--url http://localhost:8000] [--max-p99 MS] [--no-think]
+       [--password PASSWORD]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+import httpx
+from benchmarks.common import percentile
+from app.recorder import REDACTED
+
+DEFAULT_WORKLOAD = os.path.join(os.path.dirname(__file__), "workload.jsonl")
+
+
+def fill_passwords(value, password: str):
+    """
+    :param value: Workload entry or part of one
+    :param password: Password to send where the recording has REDACTED
+    :return: The value with every REDACTED string replaced
+    """
+    if isinstance(value, dict):
+        return {key: fill_passwords(item, password) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_passwords(item, password) for item in value]
+    if isinstance(value, str) and REDACTED in value:
+        return value.replace(REDACTED, password)
+    return value
+
+
+def load_workload(path: str, password: str | None = None) -> list[dict]:
+    """
+    Read a JSONL workload file
+    :param path: Path of the workload file
+    :param password: Password to send in place of redacted ones, if any
+    :return: Workload entries
+    """
+    with open(path, encoding='utf-8') as file:
+        workload = [json.loads(line) for line in file if line.strip()]
+    return workload if password is None else fill_passwords(workload, password)
+
+
+def route_of(entry: dict) -> str:
+    """Route label used to group latencies"""
+    return f"{entry['method'].upper()} {entry.get('route', entry['path'])}"
+
+
+async def send(client: httpx.AsyncClient, entry: dict) -> int:
+    """
+    Send one workload entry
+    :param client: HTTP client
+    :param entry: Workload entry
+    :return: Response status code
+    """
+    kwargs = {"params": entry.get("query") or None}
+    if "body" in entry:
+        kwargs["json"] = entry["body"]
+    elif "content" in entry:
+        kwargs["content"] = entry["content"]
+        kwargs["headers"] = {"content-type": entry.get("content_type", "text/plain")}
+    response = await client.request(entry["method"], entry["path"], **kwargs)
+    await response.aread()
+    return response.status_code
+
+
+async def replay(client: httpx.AsyncClient, workload: list[dict], concurrency: int,
+                 repeat: int, think: bool) -> tuple[dict, dict, float]:
+    """
+    Replay the workload with `concurrency` clients pulling from a shared queue
+    :return: Latencies (ms) per route, status counts per route, elapsed seconds
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(repeat):
+        for entry in workload:
+            queue.put_nowait(entry)
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def worker():
+        while not queue.empty():
+            entry = queue.get_nowait()
+            if think and entry.get("think_ms"):
+                await asyncio.sleep(entry["think_ms"] / 1000)
+            start = time.perf_counter()
+            try:
+                status = await send(client, entry)
+            except httpx.HTTPError:
+                status = 0
+            route = route_of(entry)
+            latencies[route].append((time.perf_counter() - start) * 1000)
+            statuses[route][status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def report(latencies: dict, statuses: dict, elapsed: float) -> float:
+    """
+    Print per-route throughput and latency percentiles
+    :return: Worst p99 across routes (ms)
+    """
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)\n")
+    print(f"{'route':<40} {'count':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    worst = 0.0
+    for route, samples in sorted(latencies.items()):
+        p99 = percentile(samples, 99)
+        worst = max(worst, p99)
+        codes = " ".join(f"{code}:{count}" for code, count in sorted(statuses[route].items()))
+        print(f"{route:<40} {len(samples):>6} {len(samples) / elapsed:>8.1f} "
+              f"{percentile(samples, 50):>8.1f} {percentile(samples, 95):>8.1f} {p99:>8.1f}  {codes}")
+    return worst
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """
+    Poll GET /ready so the replay does not measure warm-up
+    :param client: HTTP client
+    :param timeout: Seconds to wait before giving up
+    """
+    deadline = time.perf_counter() + timeout
+    while (await client.get("/ready")).status_code != 200:
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"server not ready after {timeout:.0f} s")
+        await asyncio.sleep(0.05)
+
+
+async def main(args) -> int:
+    workload = load_workload(args.workload, args.password)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        await wait_ready(client, args.timeout)
+        latencies, statuses, elapsed = await replay(client, workload, args.concurrency, args.repeat, args.think)
+        await client.aclose()
+    else:
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=args.timeout) as client:
+                await wait_ready(client, args.timeout)
+                latencies, statuses, elapsed = await replay(client, workload, args.concurrency, args.repeat, args.think)
+
+    worst = report(latencies, statuses, elapsed)
+    if args.max_p99 is not None and worst > args.max_p99:
+        print(f"\nFAIL: worst p99 {worst:.1f} ms exceeds {args.max_p99:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("workload", nargs="?", default=DEFAULT_WORKLOAD, help="JSONL workload file")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--repeat", type=int, default=1, help="times to replay the workload")
+    parser.add_argument("--url", default=None, help="base URL of a running server (default: in-process)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout in seconds")
+    parser.add_argument("--max-p99", type=float, default=None, help="fail if any route's p99 exceeds this (ms)")
+    parser.add_argument("--no-think", dest="think", action="store_false", help="ignore recorded think times")
+    parser.add_argument("--password", default=None, help="password sent in place of redacted recorded ones")
+    sys.exit(asyncio.run(main(parser.parse_args())))
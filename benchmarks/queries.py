@@ -0,0 +1,80 @@
+"""
+Time the listing queries for every Criteria at several page depths, with
+OFFSET pages (GET /users/) and keyset pages (GET /users/cursor).
+
+Usage: python -m benchmarks.queries [--depths 0,10,100,1000] [--size 50]
+       [--role admin] [--domain example.com] [--runs 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import tuple_
+from sqlmodel import select
+from app.database import get_engine, dispose_engines
+from app.filters import criteria_filter
+from app.models.consts import Criteria
+from app.models.user import User
+from app.serialization import PUBLIC_COLUMNS
+
+ORDER = (User.registrationTimestamp.desc(), User.email.desc())
+
+
+async def timed(conn, query, runs: int) -> tuple[float, list]:
+    """
+    Run a query several times
+    :return: Median latency (ms) and the rows of the last run
+    """
+    samples = []
+    rows = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = (await conn.execute(query)).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), rows
+
+
+async def main(args) -> None:
+    values = {None: None, Criteria.ROLE: args.role, Criteria.EMAIL_DOMAIN: args.domain,
+              Criteria.REGISTERATION_TODAY: None}
+    depths = [int(depth) for depth in args.depths.split(",")]
+
+    print(f"{'criteria':<22} {'page':>7} {'offset ms':>10} {'keyset ms':>10} {'rows':>5}")
+    async with get_engine().connect() as conn:
+        for criteria, value in values.items():
+            base = select(*PUBLIC_COLUMNS)
+            where = criteria_filter(criteria, value)
+            if where is not None:
+                base = base.where(where)
+
+            for depth in depths:
+                offset_query = base.order_by(*ORDER).offset(depth * args.size).limit(args.size + 1)
+                offset_ms, rows = await timed(conn, offset_query, args.runs)
+
+                # Keyset page at the same depth, seeking from the row just before it
+                keyset_ms = float("nan")
+                if depth:
+                    anchor = (await conn.execute(base.order_by(*ORDER).offset(depth * args.size - 1).limit(1))).first()
+                    if anchor is not None:
+                        keyset_query = (
+                            base.where(tuple_(User.registrationTimestamp, User.email)
+                                       < tuple_(anchor.registrationTimestamp, anchor.email))
+                            .order_by(*ORDER).limit(args.size + 1)
+                        )
+                        keyset_ms, _ = await timed(conn, keyset_query, args.runs)
+                else:
+                    keyset_ms = offset_ms
+
+                label = criteria.value if criteria else "all"
+                print(f"{label:<22} {depth:>7} {offset_ms:>10.2f} {keyset_ms:>10.2f} {min(len(rows), args.size):>5}")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--depths", default="0,10,100,1000", help="comma separated page numbers")
+    parser.add_argument("--size", type=int, default=50, help="page size")
+    parser.add_argument("--role", default="admin", help="value for byRole")
+    parser.add_argument("--domain", default="example.com", help="value for byEmailDomain")
+    parser.add_argument("--runs", type=int, default=5, help="runs per query (median is reported)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Check that every listing criteria is served by its own index.
+
+Runs EXPLAIN for each Criteria, first page and keyset page, with sequential
+scans disabled so small tables plan like large ones. Fails unless the plan
+reads the criteria's own index, seeks it with the criteria's Index Cond where
+the index is not partial, and needs no Sort. A full scan of the timestamp
+index with a Filter does not count.
+
+Usage: python -m benchmarks.query_plans
+"""
+import asyncio
+import sys
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlmodel import select, text
+from app.database import get_engine, dispose_engines
+from app.filters import criteria_filter
+from app.models.user import User
+from app.models.consts import ZONE, Criteria
+
+SAMPLE_VALUES = {
+    Criteria.ROLE: "admin",
+    Criteria.EMAIL_DOMAIN: "example.com",
+    Criteria.REGISTERATION_TODAY: None,
+}
+# Index each criteria must use, and the condition its Index Cond must contain
+# (None for partial indexes, which hold only matching rows)
+EXPECTED_INDEXES = {
+    Criteria.ROLE: ("ix_user_role_admin", None),
+    Criteria.EMAIL_DOMAIN: ("ix_user_emailDomain", '"emailDomain" ='),
+    Criteria.REGISTERATION_TODAY: ("ix_user_registrationTimestamp", '"registrationTimestamp" >='),
+}
+
+
+def listing_query(criteria: Criteria, keyset: bool):
+    """
+    Build the listing query issued by GET /users/ (or GET /users/cursor) for a criteria
+    :param criteria: Criteria to filter users
+    :param keyset: Continue after a position, like a cursor page
+    :return: Select statement
+    """
+    query = select(User.email).where(criteria_filter(criteria, SAMPLE_VALUES[criteria]))
+    if keyset:
+        query = query.where(tuple_(User.registrationTimestamp, User.email) < tuple_(datetime.now(ZONE), "~"))
+    return query.order_by(User.registrationTimestamp.desc(), User.email.desc()).limit(50)
+
+
+def plan_problems(plan: str, index: str, condition: str | None) -> list[str]:
+    """
+    :param plan: EXPLAIN output
+    :param index: Index the plan must read
+    :param condition: Text the index's Index Cond must contain, if any
+    :return: What is wrong with the plan, empty when it is fine
+    """
+    lines = plan.replace('"' + index + '"', index).splitlines()
+    scans = [i for i, line in enumerate(lines) if f"using {index} " in line or f" on {index} " in line]
+    problems = []
+    if not scans:
+        problems.append(f"does not use {index}")
+    elif condition and not any("Index Cond" in line and condition in line
+                               for i in scans for line in lines[i + 1:i + 3]):
+        problems.append(f"scans {index} without an Index Cond on {condition}")
+    if "Sort" in plan:
+        problems.append("sorts the matches")
+    if "Seq Scan" in plan:
+        problems.append("has a Seq Scan")
+    return problems
+
+
+async def main() -> int:
+    failures = 0
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        for criteria in Criteria:
+            index, condition = EXPECTED_INDEXES[criteria]
+            for keyset in (False, True):
+                compiled = listing_query(criteria, keyset).compile(dialect=get_engine().dialect)
+                params = tuple(compiled.params[name] for name in compiled.positiontup)
+                plan = "\n".join((await conn.exec_driver_sql(f"EXPLAIN {compiled}", params)).scalars())
+                problems = plan_problems(plan, index, condition)
+                failures += bool(problems)
+                label = f"{criteria.value}{' keyset' if keyset else ''}"
+                print(f"{'FAIL' if problems else 'ok':<5} {label} {'; '.join(problems)}\n{plan}\n")
+    await dispose_engines()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,98 @@
+"""
+Time GET /users/search end to end, served in-process against DB_PATH with
+the listing cache dropped before every request.
+
+Search terms are taken from a random sample of stored users, one group per
+kind of lookup: a full email, an email prefix, a fragment from the middle of
+an email, and a name fragment. A fixed group of broad terms that match a
+large share of generated users (BROAD_TERMS) times the SEARCH_CANDIDATES cap.
+Load data with benchmarks.generate first; the trigram indexes only pay off on
+large tables.
+
+Usage: python -m benchmarks.search [--sample 50] [--runs 3] [--size 20]
+       [--terms a,b] [--budget MS]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import httpx
+from sqlalchemy import text
+from app.filters import SEARCH_MIN_LENGTH
+from app.database import get_engine
+from benchmarks.common import percentile
+
+# Match most users made by benchmarks.generate: its domains, email prefix and names
+BROAD_TERMS = ("com", "exa", "gen", "user")
+
+
+async def sample_terms(count: int) -> dict[str, list[str]]:
+    """
+    Build search terms from a random sample of users
+    :param count: Users to sample
+    :return: Terms by kind
+    """
+    async with get_engine().connect() as conn:
+        rows = (await conn.execute(
+            text('SELECT email, name FROM "user" TABLESAMPLE SYSTEM (1) LIMIT :count'), {"count": count}
+        )).all()
+    terms = {"email": [], "email prefix": [], "email infix": [], "name": [], "broad": list(BROAD_TERMS)}
+    for email, name in rows:
+        local = email.split("@")[0]
+        terms["email"].append(email)
+        terms["email prefix"].append(local[:max(SEARCH_MIN_LENGTH, len(local) - 2)])
+        if len(local) > SEARCH_MIN_LENGTH + 1:
+            terms["email infix"].append(local[1:])
+        if len(name) >= SEARCH_MIN_LENGTH:
+            terms["name"].append(name[len(name) // 3:])
+    return terms
+
+
+async def run(args) -> dict[str, list[float]]:
+    from app.main import app
+    from app.cache import listing_cache
+
+    terms = await sample_terms(args.sample)
+    if args.terms:
+        terms["given"] = args.terms.split(",")
+
+    latencies = {kind: [] for kind in terms}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.01)
+            for kind, queries in terms.items():
+                for q in queries:
+                    for _ in range(args.runs):
+                        listing_cache.invalidate()
+                        start = time.perf_counter()
+                        response = await client.get("/users/search", params={"q": q, "size": args.size})
+                        latencies[kind].append((time.perf_counter() - start) * 1000)
+                        response.raise_for_status()
+    return latencies
+
+
+def main(args) -> int:
+    latencies = asyncio.run(run(args))
+    print(f"{'kind':<14} {'terms':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    failed = False
+    for kind, samples in latencies.items():
+        if not samples:
+            continue
+        p95 = percentile(samples, 95)
+        print(f"{kind:<14} {len(samples) // args.runs:>6} {percentile(samples, 50):>8.2f} {p95:>8.2f} {max(samples):>8.2f}")
+        if args.budget is not None and p95 > args.budget:
+            print(f"FAIL: {kind} p95 {p95:.2f} ms, budget {args.budget:.0f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sample", type=int, default=50, help="users to take search terms from")
+    parser.add_argument("--runs", type=int, default=3, help="requests per term")
+    parser.add_argument("--size", type=int, default=20, help="page size")
+    parser.add_argument("--terms", default=None, help="extra comma separated terms to time")
+    parser.add_argument("--budget", type=float, default=None, help="fail if a kind's p95 is slower (ms)")
+    sys.exit(main(parser.parse_args()))
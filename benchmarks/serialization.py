@@ -0,0 +1,73 @@
+"""
+Compare rows/sec of the ORM listing path (User entities validated and
+serialized through the model serializers) with the tuple projection path
+encoded straight to JSON bytes.
+
+Usage: python -m benchmarks.serialization [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from pydantic import TypeAdapter
+from app.models.consts import ZONE
+from app.models.user import User
+from app.serialization import encode_users
+
+PAGE_SIZES = (1_000, 10_000)
+
+
+def make_rows(count: int) -> list[tuple]:
+    """
+    Build rows shaped like a PUBLIC_COLUMNS result
+    :param count: Number of rows
+    :return: Rows of (email, name, registrationTimestamp, roles)
+    """
+    start = datetime(2024, 1, 1, tzinfo=ZONE)
+    return [
+        (f"user{i}@example.com", f"User {i}", start + timedelta(minutes=i), ["user"] if i % 10 else ["admin", "user"])
+        for i in range(count)
+    ]
+
+
+def orm_path(rows: list[tuple], adapter: TypeAdapter) -> bytes:
+    """Hydrate User entities, then validate and serialize them like FastAPI does for list[User]"""
+    users = [
+        User(email=email, name=name, password="", registrationTimestamp=timestamp, roles=roles)
+        for email, name, timestamp, roles in rows
+    ]
+    return adapter.dump_json(adapter.validate_python(users))
+
+
+def tuple_path(rows: list[tuple], adapter: TypeAdapter) -> bytes:
+    """Encode projected tuples directly"""
+    return encode_users(rows)
+
+
+def measure(fn, rows: list[tuple], adapter: TypeAdapter, repeat: int) -> float:
+    """
+    Best-of-N throughput of an encoding path
+    :return: Rows per second
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows, adapter)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main(repeat: int) -> None:
+    adapter = TypeAdapter(list[User])
+    print(f"{'rows':>7} {'orm rows/s':>12} {'tuple rows/s':>13} {'speedup':>8}")
+    for size in PAGE_SIZES:
+        rows = make_rows(size)
+        orm = measure(orm_path, rows, adapter, repeat)
+        fast = measure(tuple_path, rows, adapter, repeat)
+        print(f"{size:>7} {orm:>12,.0f} {fast:>13,.0f} {fast / orm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,108 @@
+"""
+Measure cold start: how long `import app.main` takes (from `-X importtime`)
+and how long the app needs after startup until GET /ready answers 200.
+
+Import time is measured in fresh interpreters, keeping the fastest run so
+bytecode compilation of the first run is not counted. Time to ready uses the
+database from DB_PATH.
+
+Exits 1 when either exceeds its budget (IMPORT_BUDGET_MS, READY_BUDGET_MS
+by default; 0 disables a check).
+
+Usage: python -m benchmarks.startup [--runs 3] [--top 15]
+       [--import-budget 1500] [--ready-budget 2000]
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from collections import defaultdict
+import httpx
+
+MODULE = "app.main"
+# Default budgets (ms). Ready includes bcrypt calibration, about BCRYPT_TARGET_MS
+# per probe hash, and filling the connection pool
+IMPORT_BUDGET_MS = 1500
+READY_BUDGET_MS = 2000
+
+
+def import_times() -> dict[str, tuple[int, int]]:
+    """
+    Import the app in a fresh interpreter with -X importtime
+    :return: Module name -> (self, cumulative) microseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times.setdefault(name.strip(), (int(own), int(cumulative)))
+    return times
+
+
+def by_package(times: dict[str, tuple[int, int]]) -> list[tuple[str, int]]:
+    """
+    Sum self time per top-level package
+    :param times: Module name -> (self, cumulative) microseconds
+    :return: (package, microseconds), slowest first
+    """
+    totals = defaultdict(int)
+    for name, (own, _) in times.items():
+        totals[name.split(".")[0]] += own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+async def time_to_ready(timeout: float = 30.0) -> float:
+    """
+    Start the app's lifespan and poll GET /ready
+    :param timeout: Seconds to wait before giving up
+    :return: Seconds from startup until ready
+    """
+    from app.main import app
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            while (await client.get("/ready")).status_code != 200:
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"not ready after {timeout:.0f} s")
+                await asyncio.sleep(0.01)
+            return time.perf_counter() - start
+
+
+def main(args) -> int:
+    runs = [import_times() for _ in range(args.runs)]
+    times = min(runs, key=lambda run: run[MODULE][1])
+    import_ms = times[MODULE][1] / 1000
+
+    print(f"import {MODULE}: {import_ms:.0f} ms")
+    print(f"{'package':<24} {'self ms':>8}")
+    for package, micros in by_package(times)[:args.top]:
+        print(f"{package:<24} {micros / 1000:>8.1f}")
+
+    ready_ms = asyncio.run(time_to_ready()) * 1000
+    print(f"\nstartup to ready: {ready_ms:.0f} ms")
+
+    failed = False
+    if args.import_budget and import_ms > args.import_budget:
+        print(f"FAIL: import took {import_ms:.0f} ms, budget {args.import_budget:.0f} ms")
+        failed = True
+    if args.ready_budget and ready_ms > args.ready_budget:
+        print(f"FAIL: ready after {ready_ms:.0f} ms, budget {args.ready_budget:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to import in")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS,
+                        help="fail if importing takes longer (ms, 0 disables)")
+    parser.add_argument("--ready-budget", type=float, default=READY_BUDGET_MS,
+                        help="fail if ready takes longer (ms, 0 disables)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""user filter indexes
+
+Revision ID: 3f6b2c9d1e7a
+Revises: 05a280835e83
+Create Date: 2026-10-17 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b2c9d1e7a'
+down_revision: Union[str, Sequence[str], None] = '05a280835e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column(
+        'emailDomain',
+        sqlmodel.sql.sqltypes.AutoString(),
+        sa.Computed("split_part(email, '@', 2)", persisted=True),
+        nullable=True
+    ))
+    op.create_index('ix_user_emailDomain', 'user', ['emailDomain'])
+    op.create_index('ix_user_roles', 'user', ['roles'], postgresql_using='gin')
+    op.create_index(
+        'ix_user_registrationTimestamp', 'user',
+        [sa.text('"registrationTimestamp" DESC'), sa.text('email DESC')]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_registrationTimestamp', table_name='user')
+    op.drop_index('ix_user_roles', table_name='user')
+    op.drop_index('ix_user_emailDomain', table_name='user')
+    op.drop_column('user', 'emailDomain')
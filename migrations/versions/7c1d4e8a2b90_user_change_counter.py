@@ -0,0 +1,49 @@
+"""user change counter
+
+Revision ID: 7c1d4e8a2b90
+Revises: 3f6b2c9d1e7a
+Create Date: 2026-10-17 14:20:08.114372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d4e8a2b90'
+down_revision: Union[str, Sequence[str], None] = '3f6b2c9d1e7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'table_version',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO table_version (name, version) VALUES ('user', 0)")
+    op.execute("""
+        CREATE FUNCTION bump_user_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_version SET version = version + 1 WHERE name = 'user';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER user_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "user"
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_user_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER user_version ON "user"')
+    op.execute('DROP FUNCTION bump_user_version()')
+    op.drop_table('table_version')
@@ -0,0 +1,67 @@
+"""role bitmask
+
+Revision ID: 9a4e2f6c1b37
+Revises: 7c1d4e8a2b90
+Create Date: 2026-10-17 16:05:32.420917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e2f6c1b37'
+down_revision: Union[str, Sequence[str], None] = '7c1d4e8a2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The role registry (app.models.roles.ROLES) as of this revision
+ROLES = ("user", "admin", "editor", "viewer", "moderator", "guest")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    unknown = op.get_bind().execute(
+        sa.text('SELECT DISTINCT role FROM "user", unnest(roles) AS role WHERE role <> ALL(:roles) ORDER BY role'),
+        {'roles': list(ROLES)}
+    ).scalars().all()
+    if unknown:
+        raise RuntimeError(f"Roles missing from the registry: {', '.join(unknown)}")
+
+    op.drop_index('ix_user_roles', table_name='user')
+    # One rewrite of the table; ALTER ... USING does not allow subqueries, so each
+    # role is tested separately
+    mask = " | ".join(
+        f"CASE WHEN roles @> ARRAY['{role}']::varchar[] THEN {1 << bit} ELSE 0 END"
+        for bit, role in enumerate(ROLES)
+    )
+    op.alter_column('user', 'roles', type_=sa.Integer(), nullable=False, postgresql_using=f"coalesce({mask}, 0)")
+    for bit, role in enumerate(ROLES):
+        op.create_index(
+            f'ix_user_role_{role}', 'user',
+            [sa.text('"registrationTimestamp" DESC'), sa.text('email DESC')],
+            postgresql_where=sa.text(f'(roles & {1 << bit}) != 0')
+        )
+        # Without expression statistics every role filter is estimated to match
+        # almost all rows, which breaks the estimated totals
+        op.execute(f'CREATE STATISTICS user_role_{role} ON (roles & {1 << bit}) FROM "user"')
+    op.execute('ANALYZE "user"')
+    # Roles now come back in registry order, so cached listings are stale
+    op.execute("UPDATE table_version SET version = version + 1 WHERE name = 'user'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for role in ROLES:
+        op.execute(f'DROP STATISTICS user_role_{role}')
+        op.drop_index(f'ix_user_role_{role}', table_name='user')
+    names = ", ".join(
+        f"CASE WHEN roles & {1 << bit} != 0 THEN '{role}' END"
+        for bit, role in enumerate(ROLES)
+    )
+    op.alter_column('user', 'roles', type_=sa.ARRAY(sa.String()), nullable=True,
+                    postgresql_using=f"array_remove(ARRAY[{names}]::varchar[], NULL)")
+    op.create_index('ix_user_roles', 'user', ['roles'], postgresql_using='gin')
+    op.execute("UPDATE table_version SET version = version + 1 WHERE name = 'user'")
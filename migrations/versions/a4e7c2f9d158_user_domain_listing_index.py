@@ -0,0 +1,35 @@
+"""user domain listing index
+
+Revision ID: a4e7c2f9d158
+Revises: f2c9d4b7a613
+Create Date: 2026-10-18 11:02:18.639420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7c2f9d158'
+down_revision: Union[str, Sequence[str], None] = 'f2c9d4b7a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Domain listings and keyset pages read in index order instead of sorting every
+    # user of the domain
+    op.drop_index('ix_user_emailDomain', table_name='user')
+    op.create_index(
+        'ix_user_emailDomain', 'user',
+        ['emailDomain', sa.text('"registrationTimestamp" DESC'), sa.text('email DESC')]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_emailDomain', table_name='user')
+    op.create_index('ix_user_emailDomain', 'user', ['emailDomain'])
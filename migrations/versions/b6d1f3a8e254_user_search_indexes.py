@@ -0,0 +1,33 @@
+"""user search indexes
+
+Revision ID: b6d1f3a8e254
+Revises: 9a4e2f6c1b37
+Create Date: 2026-10-17 17:32:10.681205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f3a8e254'
+down_revision: Union[str, Sequence[str], None] = '9a4e2f6c1b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ships with PostgreSQL's contrib modules (included in the postgres docker images)
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_user_email_trgm', 'user', ['email'], postgresql_using='gin',
+                    postgresql_ops={'email': 'gin_trgm_ops'})
+    op.create_index('ix_user_name_trgm', 'user', ['name'], postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_name_trgm', table_name='user')
+    op.drop_index('ix_user_email_trgm', table_name='user')
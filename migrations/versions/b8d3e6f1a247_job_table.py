@@ -0,0 +1,45 @@
+"""job table
+
+Revision ID: b8d3e6f1a247
+Revises: a4e7c2f9d158
+Create Date: 2026-10-18 11:40:52.117803
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3e6f1a247'
+down_revision: Union[str, Sequence[str], None] = 'a4e7c2f9d158'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'job',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('state', sa.Enum('pending', 'running', 'done', 'failed', 'cancelled', name='jobstate',
+                                   native_enum=False, length=16), nullable=False),
+        sa.Column('criteria', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('value', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('estimated_rows', sa.BigInteger(), nullable=True),
+        sa.Column('scanned', sa.BigInteger(), nullable=False),
+        sa.Column('affected', sa.BigInteger(), nullable=False),
+        sa.Column('error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job')
@@ -0,0 +1,77 @@
+"""user counts lock order
+
+Revision ID: c1f5a8e3b926
+Revises: b8d3e6f1a247
+Create Date: 2026-10-18 12:15:09.842177
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f5a8e3b926'
+down_revision: Union[str, Sequence[str], None] = 'b8d3e6f1a247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows a statement added (+1) and removed (-1), per trigger event
+CHANGES = {
+    'INSERT': "SELECT roles, \"emailDomain\", \"registrationTimestamp\", 1 AS delta FROM new_rows",
+    'DELETE': "SELECT roles, \"emailDomain\", \"registrationTimestamp\", -1 AS delta FROM old_rows",
+}
+CHANGES['UPDATE'] = f"{CHANGES['INSERT']} UNION ALL {CHANGES['DELETE']}"
+
+
+def count_users(ordered: bool) -> str:
+    """
+    :param ordered: Upsert counter rows in key order
+    :return: CREATE OR REPLACE statement for the count_users() trigger function
+    """
+    order = {key: f"ORDER BY {key}" if ordered else "" for key in ('roles', '"emailDomain"', '1')}
+    return f"""
+        CREATE OR REPLACE FUNCTION count_users() RETURNS trigger AS $$
+        DECLARE
+            changes text := CASE TG_OP
+                WHEN 'INSERT' THEN $q${CHANGES['INSERT']}$q$
+                WHEN 'DELETE' THEN $q${CHANGES['DELETE']}$q$
+                ELSE $q${CHANGES['UPDATE']}$q$
+            END;
+        BEGIN
+            EXECUTE format($q$
+                INSERT INTO user_role_count AS c (roles, users)
+                SELECT roles, sum(delta) FROM (%s) changes GROUP BY roles HAVING sum(delta) <> 0
+                {order['roles']}
+                ON CONFLICT (roles) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            EXECUTE format($q$
+                INSERT INTO user_domain_count AS c (domain, users)
+                SELECT "emailDomain", sum(delta) FROM (%s) changes GROUP BY "emailDomain" HAVING sum(delta) <> 0
+                {order['"emailDomain"']}
+                ON CONFLICT (domain) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            EXECUTE format($q$
+                INSERT INTO user_hour_count AS c (hour, users)
+                SELECT date_trunc('hour', "registrationTimestamp", 'UTC'), sum(delta) FROM (%s) changes
+                WHERE "registrationTimestamp" IS NOT NULL
+                GROUP BY 1 HAVING sum(delta) <> 0
+                {order['1']}
+                ON CONFLICT (hour) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent multi-row statements lock counter rows in the same (key) order,
+    # so they wait for each other instead of deadlocking
+    op.execute(count_users(ordered=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(count_users(ordered=False))
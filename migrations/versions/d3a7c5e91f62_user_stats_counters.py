@@ -0,0 +1,133 @@
+"""user stats counters
+
+Revision ID: d3a7c5e91f62
+Revises: b6d1f3a8e254
+Create Date: 2026-10-17 18:44:51.093318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7c5e91f62'
+down_revision: Union[str, Sequence[str], None] = 'b6d1f3a8e254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows a statement added (+1) and removed (-1), per trigger event
+CHANGES = {
+    'INSERT': "SELECT roles, \"emailDomain\", \"registrationTimestamp\", 1 AS delta FROM new_rows",
+    'DELETE': "SELECT roles, \"emailDomain\", \"registrationTimestamp\", -1 AS delta FROM old_rows",
+}
+CHANGES['UPDATE'] = f"{CHANGES['INSERT']} UNION ALL {CHANGES['DELETE']}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_role_count',
+        sa.Column('roles', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('users', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('roles')
+    )
+    op.create_table(
+        'user_domain_count',
+        sa.Column('domain', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('users', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('domain')
+    )
+    op.create_index('ix_user_domain_count_users', 'user_domain_count', [sa.text('users DESC')])
+    op.create_table(
+        'user_hour_count',
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('users', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('hour')
+    )
+
+    # Statement level, so a bulk statement applies one aggregated delta per counter.
+    # Changes that cancel out (e.g. a name update) write nothing.
+    op.execute(f"""
+        CREATE FUNCTION count_users() RETURNS trigger AS $$
+        DECLARE
+            changes text := CASE TG_OP
+                WHEN 'INSERT' THEN $q${CHANGES['INSERT']}$q$
+                WHEN 'DELETE' THEN $q${CHANGES['DELETE']}$q$
+                ELSE $q${CHANGES['UPDATE']}$q$
+            END;
+        BEGIN
+            EXECUTE format($q$
+                INSERT INTO user_role_count AS c (roles, users)
+                SELECT roles, sum(delta) FROM (%s) changes GROUP BY roles HAVING sum(delta) <> 0
+                ON CONFLICT (roles) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            EXECUTE format($q$
+                INSERT INTO user_domain_count AS c (domain, users)
+                SELECT "emailDomain", sum(delta) FROM (%s) changes GROUP BY "emailDomain" HAVING sum(delta) <> 0
+                ON CONFLICT (domain) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            EXECUTE format($q$
+                INSERT INTO user_hour_count AS c (hour, users)
+                SELECT date_trunc('hour', "registrationTimestamp", 'UTC'), sum(delta) FROM (%s) changes
+                WHERE "registrationTimestamp" IS NOT NULL
+                GROUP BY 1 HAVING sum(delta) <> 0
+                ON CONFLICT (hour) DO UPDATE SET users = c.users + excluded.users
+            $q$, changes);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER user_count_insert AFTER INSERT ON "user"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_users()
+    """)
+    op.execute("""
+        CREATE TRIGGER user_count_update AFTER UPDATE ON "user"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_users()
+    """)
+    op.execute("""
+        CREATE TRIGGER user_count_delete AFTER DELETE ON "user"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION count_users()
+    """)
+    op.execute("""
+        CREATE FUNCTION reset_user_counts() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM user_role_count;
+            DELETE FROM user_domain_count;
+            DELETE FROM user_hour_count;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER user_count_truncate AFTER TRUNCATE ON "user"
+        FOR EACH STATEMENT EXECUTE FUNCTION reset_user_counts()
+    """)
+
+    # Creating the triggers locked out writers, so the backfill sees every row
+    op.execute('INSERT INTO user_role_count (roles, users) SELECT roles, count(*) FROM "user" GROUP BY roles')
+    op.execute('INSERT INTO user_domain_count (domain, users) '
+               'SELECT "emailDomain", count(*) FROM "user" GROUP BY "emailDomain"')
+    op.execute("INSERT INTO user_hour_count (hour, users) "
+               "SELECT date_trunc('hour', \"registrationTimestamp\", 'UTC'), count(*) FROM \"user\" "
+               "WHERE \"registrationTimestamp\" IS NOT NULL GROUP BY 1")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER user_count_truncate ON "user"')
+    op.execute('DROP TRIGGER user_count_delete ON "user"')
+    op.execute('DROP TRIGGER user_count_update ON "user"')
+    op.execute('DROP TRIGGER user_count_insert ON "user"')
+    op.execute('DROP FUNCTION reset_user_counts()')
+    op.execute('DROP FUNCTION count_users()')
+    op.drop_table('user_hour_count')
+    op.drop_index('ix_user_domain_count_users', table_name='user_domain_count')
+    op.drop_table('user_domain_count')
+    op.drop_table('user_role_count')
@@ -0,0 +1,33 @@
+"""registration timestamp not null
+
+Revision ID: e5b8a2c4f719
+Revises: d3a7c5e91f62
+Create Date: 2026-10-17 21:12:40.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8a2c4f719'
+down_revision: Union[str, Sequence[str], None] = 'd3a7c5e91f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pages compare (registrationTimestamp, email) row values, which never
+    # match NULL. Users without a timestamp sort last, as the oldest.
+    op.execute("UPDATE \"user\" SET \"registrationTimestamp\" = 'epoch' WHERE \"registrationTimestamp\" IS NULL")
+    op.alter_column('user', 'registrationTimestamp', existing_type=sa.DateTime(timezone=True),
+                    nullable=False, server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('user', 'registrationTimestamp', existing_type=sa.DateTime(timezone=True),
+                    nullable=True, server_default=None)
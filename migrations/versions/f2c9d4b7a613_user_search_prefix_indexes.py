@@ -0,0 +1,33 @@
+"""user search prefix indexes
+
+Revision ID: f2c9d4b7a613
+Revises: e5b8a2c4f719
+Create Date: 2026-10-18 10:24:37.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9d4b7a613'
+down_revision: Union[str, Sequence[str], None] = 'e5b8a2c4f719'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # "C" collation so prefix ranges and their ordering can both use the btree
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email) COLLATE "C"')])
+    op.create_index('ix_user_name_lower', 'user', [sa.text('lower(name) COLLATE "C"')])
+    # Statistics for the indexed expressions, so broad prefixes are read in index order
+    op.execute('ANALYZE "user"')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_name_lower', table_name='user')
+    op.drop_index('ix_user_email_lower', table_name='user')
@@ -169,7 +169,7 @@ def start_server() -> None:
     """Start the uvicorn server in foreground."""
     print()
     print_info("Starting uvicorn server...")
-    print_info("Visit http://localhost:8000/ to initialize data")
+    print_info("Sample data is loaded when the server starts")
     print_info("Visit http://localhost:8000/docs for swagger UI")
     print()
     